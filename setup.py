@@ -42,6 +42,12 @@ setup(
     python_requires='>=3.7',
     include_package_data=True,
     install_requires=import_requirements(),
+    extras_require={
+        # Help image thumbnails
+        'images': ['Pillow>=8.0'],
+        # zstd compressed storage of the help records payloads
+        'zstd': ['zstandard'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
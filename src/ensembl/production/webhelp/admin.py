@@ -10,23 +10,133 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import json
-
-from django.contrib import admin
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.utils import unquote
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseRedirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
 from ensembl.production.djcore.admin import ProductionUserAdminMixin
 
-from ensembl.production.webhelp.forms import WebSiteRecordForm, LookupItemForm, MovieForm, FaqForm, ViewForm
+from ensembl.production.webhelp.compression import decode_data
+from ensembl.production.webhelp.filters import DivisionListFilter, FaqCategoryListFilter, StatusListFilter
+from ensembl.production.webhelp.forms import (WebSiteRecordForm, LookupItemForm, MovieForm, FaqForm, ViewForm,
+                                              HelpRecordActionForm)
 from ensembl.production.webhelp.models import *
+from ensembl.production.webhelp.paginator import (CachedCountPaginator, decode_cursor, encode_cursor,
+                                                  keyset_condition, keyset_ordering, keyset_values)
+from ensembl.production.webhelp.revisions import html_diff
+from ensembl.production.webhelp.search import RANK_ANNOTATION, search
 from ensembl.production.webhelp.views import *
 
 
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+# Line breaks and tabs dropped from the submitted values, meaningless in the stored html
+STRIPPED_CHARACTERS = str.maketrans('', '', '\n\r\t')
+
+
+def stripped_data(form, fields):
+    """
+    Cleaned values of the `fields` of `form`, without line breaks and tabs, for the `data` payload.
+    """
+    return {field: form.cleaned_data[field].translate(STRIPPED_CHARACTERS) for field in form.fields if field in fields}
+
+
+class KeysetChangeListMixin:
+    """
+    Seek pagination over the admin `keyset_ordering`, enabled with `WEBHELP_ADMIN_KEYSET_PAGINATION`.
+    Pages start after (before) the last (first) row of the current one instead of skipping an OFFSET, so that
+    previous / next pages cost the same whatever their depth. Only applies to the default ordering, sorting on a
+    column, searching or showing all rows goes back to numbered pages.
+    """
+    keyset = False
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for cursor_var in (AFTER_VAR, BEFORE_VAR):
+            lookup_params.pop(cursor_var, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter and sort links restart from the first page
+        new_params = new_params or {}
+        remove = list(remove or []) + [var for var in (AFTER_VAR, BEFORE_VAR) if var not in new_params]
+        return super().get_query_string(new_params, remove)
+
+    def get_ordering(self, request, queryset):
+        self.keyset = bool(self.model_admin.keyset_pagination and not self.query and not self.show_all
+                           and ORDER_VAR not in self.params)
+        if self.keyset:
+            return keyset_ordering(self.model_admin.keyset_ordering)
+        return super().get_ordering(request, queryset)
+
+    def get_results(self, request):
+        if not self.keyset:
+            return super().get_results(request)
+        keys = self.model_admin.keyset_ordering
+        try:
+            after, before = [decode_cursor(self.model, keys, self.params[var]) if self.params.get(var) else None
+                             for var in (AFTER_VAR, BEFORE_VAR)]
+        except ValueError as e:
+            raise IncorrectLookupParameters(e)
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = paginator.count
+        if self.model_admin.show_full_result_count:
+            self.full_result_count = self.root_queryset.count()
+        else:
+            self.full_result_count = None
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        if before is not None:
+            page = list(self.queryset.filter(keyset_condition(keys, before, before=True))
+                        .order_by(*keyset_ordering(keys, reverse=True))[:self.list_per_page + 1])
+            has_previous, has_next = len(page) > self.list_per_page, True
+            page = page[:self.list_per_page][::-1]
+        else:
+            queryset = self.queryset
+            if after is not None:
+                queryset = queryset.filter(keyset_condition(keys, after))
+            page = list(queryset[:self.list_per_page + 1])
+            has_previous, has_next = after is not None, len(page) > self.list_per_page
+            page = page[:self.list_per_page]
+        self.result_list = page
+        self.next_page_url = self.get_query_string(
+            {AFTER_VAR: encode_cursor(keyset_values(page[-1], keys))}) if page and has_next else None
+        self.previous_page_url = self.get_query_string(
+            {BEFORE_VAR: encode_cursor(keyset_values(page[0], keys))}) if page and has_previous else None
+        self.can_show_all = False
+        self.multi_page = bool(self.next_page_url or self.previous_page_url)
+        self.paginator = paginator
+
+
+class KeysetChangeList(KeysetChangeListMixin, ChangeList):
+    pass
+
+
 class HelpLinkInline(admin.TabularInline):
     model = HelpLink
 
 
 class HelpLinkModelAdmin(admin.ModelAdmin):
     list_per_page = 50
+    keyset_ordering = ('-help_link_id',)
+
+    @property
+    def keyset_pagination(self):
+        return getattr(settings, 'WEBHELP_ADMIN_KEYSET_PAGINATION', False)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
 
     def has_delete_permission(self, request, obj=None):
         if not request.user.is_superuser:
@@ -46,12 +156,110 @@ class HelpLinkModelAdmin(admin.ModelAdmin):
 from django.urls import path
 
 
+class HelpRecordChangeList(KeysetChangeListMixin, ChangeList):
+
+    def get_queryset(self, request):
+        # Only the small columns displayed are fetched, `data` keys are read from the JSON annotations
+        return super().get_queryset(request).summary(*self.model_admin.summary_fields)
+
+    def get_ordering(self, request, queryset):
+        ordering = super().get_ordering(request, queryset)
+        if RANK_ANNOTATION in queryset.query.annotations and ORDER_VAR not in self.params:
+            # Best full text matches first, unless the user picked a column
+            ordering.insert(0, '-%s' % RANK_ANNOTATION)
+        return ordering
+
+
 class HelpRecordModelAdmin(ProductionUserAdminMixin):
     list_per_page = 50
     readonly_fields = (
         'help_record_id', 'created_by', 'created_at', 'modified_by', 'modified_at')
     ordering = ('-modified_at', '-created_at')
-    list_filter = ['created_by', 'modified_by']
+    list_filter = [StatusListFilter, 'created_by', 'modified_by']
+    # `data` keys displayed in the changelist, extracted by the database as `json_<key>`
+    json_list_fields = ()
+    # Rich text keys displayed in the changelist, from the html rendered on save as `rendered_<key>`
+    rendered_list_fields = ()
+    # Columns loaded by the changelist: everything its list_display (and keyset pagination) reads
+    summary_fields = ('keyword', 'status', 'modified_at')
+    keyset_ordering = ('-modified_at', '-help_record_id')
+    action_form = HelpRecordActionForm
+    actions = ['make_live', 'make_draft', 'make_dead', 'add_keyword', 'remove_keyword']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_json_fields(*self.json_list_fields).with_rendered_fields(
+            *self.rendered_list_fields)
+
+    @property
+    def show_full_result_count(self):
+        # The unfiltered total is one more COUNT(*) per page, skipped in fast count mode
+        return not getattr(settings, 'WEBHELP_ADMIN_FAST_COUNT', False)
+
+    @property
+    def keyset_pagination(self):
+        return getattr(settings, 'WEBHELP_ADMIN_KEYSET_PAGINATION', False)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if getattr(settings, 'WEBHELP_ADMIN_FAST_COUNT', False):
+            return CachedCountPaginator(queryset, per_page, orphans, allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_changelist(self, request, **kwargs):
+        return HelpRecordChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        # Text is looked up in the full text index, `search_fields` only cover the remaining small columns
+        matched, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        searched = search(queryset, search_term, matched if self.get_search_fields(request) else None)
+        if searched is None:
+            return matched, may_have_duplicates
+        return searched, may_have_duplicates
+
+    def set_status(self, request, queryset, status):
+        # One UPDATE for the whole selection, stamped like a change form save
+        updated = queryset.set_status(status, request.user)
+        self.message_user(request, '%s record(s) set %s.' % (updated, status), messages.SUCCESS)
+
+    def make_live(self, request, queryset):
+        self.set_status(request, queryset, 'live')
+
+    def make_draft(self, request, queryset):
+        self.set_status(request, queryset, 'draft')
+
+    def make_dead(self, request, queryset):
+        self.set_status(request, queryset, 'dead')
+
+    def action_keyword(self, request):
+        keyword = request.POST.get('keyword', '').strip()
+        if not keyword or ',' in keyword:
+            self.message_user(request, 'Enter a single keyword, without comma.', messages.ERROR)
+            return None
+        return keyword
+
+    def add_keyword(self, request, queryset):
+        keyword = self.action_keyword(request)
+        if keyword:
+            updated = queryset.add_keyword(keyword, request.user)
+            self.message_user(request, 'Keyword "%s" added to %s record(s).' % (keyword, updated), messages.SUCCESS)
+
+    def remove_keyword(self, request, queryset):
+        keyword = self.action_keyword(request)
+        if keyword:
+            updated = queryset.remove_keyword(keyword, request.user)
+            self.message_user(request, 'Keyword "%s" removed from %s record(s).' % (keyword, updated),
+                              messages.SUCCESS)
+
+    make_live.short_description = 'Set selected records live'
+    make_draft.short_description = 'Set selected records draft'
+    make_dead.short_description = 'Set selected records dead'
+    add_keyword.short_description = 'Add keyword to selected records'
+    remove_keyword.short_description = 'Remove keyword from selected records'
+    # Same staff check as the change form
+    make_live.allowed_permissions = ('change',)
+    make_draft.allowed_permissions = ('change',)
+    make_dead.allowed_permissions = ('change',)
+    add_keyword.allowed_permissions = ('change',)
+    remove_keyword.allowed_permissions = ('change',)
 
     def has_delete_permission(self, request, obj=None):
         if not request.user.is_superuser:
@@ -67,6 +275,78 @@ class HelpRecordModelAdmin(ProductionUserAdminMixin):
     def has_change_permission(self, request, obj=None):
         return request.user.is_staff
 
+    def save_model(self, request, obj, form, change):
+        if change and not obj.revisions.exists():
+            # First change since revisions are kept: keep the version about to be replaced
+            previous = HelpRecord.objects.get(pk=obj.pk)
+            HelpRecordRevision.objects.record(previous, previous.modified_by_id or previous.created_by_id)
+        super().save_model(request, obj, form, change)
+        HelpRecordRevision.objects.record(obj, request.user)
+
+    def get_revision_object(self, request, object_id, number=None):
+        obj = self.get_object(request, unquote(object_id))
+        if obj is None or not self.has_view_or_change_permission(request, obj):
+            raise Http404('No %s %s' % (self.model._meta.verbose_name, object_id))
+        if number is None:
+            return obj, None
+        try:
+            return obj, obj.revisions.get(number=number)
+        except HelpRecordRevision.DoesNotExist:
+            raise Http404('No revision %s of %s' % (number, obj))
+
+    def revision_context(self, request, obj, title, **kwargs):
+        return dict(
+            self.admin_site.each_context(request),
+            title=title,
+            opts=self.model._meta,
+            original=obj,
+            has_change_permission=self.has_change_permission(request, obj),
+            **kwargs,
+        )
+
+    def revisions_view(self, request, object_id):
+        obj, _ = self.get_revision_object(request, object_id)
+        # Payloads are only read for a diff or a restore
+        revisions = list(obj.revisions.defer('payload'))
+        # Users may live in another database: no join, one lookup of the authors
+        authors = get_user_model().objects.in_bulk(set(
+            revision.created_by_id for revision in revisions if revision.created_by_id))
+        for revision in revisions:
+            HelpRecordRevision.created_by.field.set_cached_value(revision, authors.get(revision.created_by_id))
+        context = self.revision_context(request, obj, 'Revisions of %s' % obj, revisions=revisions)
+        return TemplateResponse(request, 'admin/ensembl_website/revision_list.html', context)
+
+    def revision_diff_view(self, request, object_id, number):
+        """
+        Differences of revision `number` from the revision given as `against` (default: the previous one) or from
+        the current content with `against=current`.
+        """
+        obj, revision = self.get_revision_object(request, object_id, number)
+        against = request.GET.get('against')
+        if against == 'current':
+            old_text, old_label = decode_data(obj.data), 'Current'
+        else:
+            try:
+                against = int(against) if against else number - 1
+            except ValueError:
+                raise Http404('Invalid revision %s' % against)
+            previous = obj.revisions.filter(number=against).first()
+            old_text, old_label = (previous.get_text(), 'Revision %s' % against) if previous else ('', '')
+        context = self.revision_context(
+            request, obj, 'Revision %s of %s' % (number, obj), revision=revision,
+            diff=mark_safe(html_diff(old_text, revision.get_text(), old_label, 'Revision %s' % number)))
+        return TemplateResponse(request, 'admin/ensembl_website/revision_diff.html', context)
+
+    def revision_restore_view(self, request, object_id, number):
+        obj, revision = self.get_revision_object(request, object_id, number)
+        if request.method != 'POST' or not self.has_change_permission(request, obj):
+            raise PermissionDenied
+        HelpRecordRevision.objects.restore(revision, request.user)
+        self.log_change(request, obj, 'Restored revision %s.' % number)
+        self.message_user(request, 'Revision %s of %s restored.' % (number, obj), messages.SUCCESS)
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return HttpResponseRedirect(reverse('admin:%s_%s_change' % info, args=[obj.pk]))
+
     def get_urls(self):
         urls = super().get_urls()
         info = self.model._meta.app_label, self.model._meta.model_name
@@ -78,9 +358,18 @@ class HelpRecordModelAdmin(ProductionUserAdminMixin):
         }
         ext_urls = [
             path(r'<path:object_id>/preview/',
-                 self.admin_site.admin_view(getattr(object_map[self.model._meta.model_name], 'as_view')()),
+                 # Cacheable: the preview answers conditional requests itself
+                 self.admin_site.admin_view(getattr(object_map[self.model._meta.model_name], 'as_view')(),
+                                            cacheable=True),
                  {'model_admin': self, },
-                 name='%s_%s_preview' % info)
+                 name='%s_%s_preview' % info),
+            path('<path:object_id>/revisions/', self.admin_site.admin_view(self.revisions_view),
+                 name='%s_%s_revisions' % info),
+            path('<path:object_id>/revisions/<int:number>/', self.admin_site.admin_view(self.revision_diff_view),
+                 name='%s_%s_revision' % info),
+            path('<path:object_id>/revisions/<int:number>/restore/',
+                 self.admin_site.admin_view(self.revision_restore_view),
+                 name='%s_%s_revision_restore' % info),
         ]
         return ext_urls + urls
 
@@ -92,6 +381,25 @@ class HelpLinkItemAdmin(HelpLinkModelAdmin):
     fields = ('page_url',)
     search_fields = ('page_url',)
 
+    @staticmethod
+    def index_records(ids):
+        # Page urls are part of the indexed text of their record, link changes bypass the record save
+        HelpRecordSearch.objects.index(ViewRecord.objects.filter(pk__in=[pk for pk in ids if pk]))
+
+    def save_model(self, request, obj, form, change):
+        previous = HelpLink.objects.filter(pk=obj.pk).values_list('help_record_id', flat=True).first()
+        super().save_model(request, obj, form, change)
+        self.index_records({previous, obj.help_record_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.index_records({obj.help_record_id})
+
+    def delete_queryset(self, request, queryset):
+        ids = set(queryset.values_list('help_record_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.index_records(ids)
+
 
 @admin.register(MovieRecord)
 class MovieItemAdmin(HelpRecordModelAdmin):
@@ -100,33 +408,33 @@ class MovieItemAdmin(HelpRecordModelAdmin):
     fields = ('title', 'help_record_id', 'youtube_id', 'youku_id', 'list_position', 'length', 'keyword', 'status',
               ('created_by', 'created_at'),
               ('modified_by', 'modified_at'))
-    search_fields = ('data', 'keyword', 'status', 'help_record_id')
+    search_fields = ('status', 'help_record_id')
+    json_list_fields = ('title', 'youku_id')
+    summary_fields = HelpRecordModelAdmin.summary_fields + ('movie_youtube_id',)
 
     def title(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('title')
+            return obj.get_json_field('title')
 
     def youtube_id(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('youtube_id')
+            return obj.movie_youtube_id
 
     def youku_id(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('youku_id')
+            return obj.get_json_field('youku_id')
 
     def save_model(self, request, obj, form, change):
-        extra_field = {field: form.cleaned_data[field].replace('\n', '').replace('\r', '').replace('\t', '') for field
-                       in form.fields if
-                       field in ('title', 'list_position', 'youtube_id', 'youku_id', 'length')}
+        extra_field = stripped_data(form, ('title', 'list_position', 'youtube_id', 'youku_id', 'length'))
         obj.data = json.dumps(extra_field)
         super().save_model(request, obj, form, change)
 
     def movie_id(self, obj):
         return obj.help_record_id
 
+    title.admin_order_field = 'json_title'
+    youtube_id.admin_order_field = 'movie_youtube_id'
+    youku_id.admin_order_field = 'json_youku_id'
     movie_id.short_description = 'Movie ID'
     movie_id.admin_order_field = 'help_record_id'
 
@@ -138,22 +446,26 @@ class FaqItemAdmin(HelpRecordModelAdmin):
     fields = ('category', 'question', 'answer', 'keyword', 'status', 'division',
               ('created_by', 'created_at'),
               ('modified_by', 'modified_at'))
-    search_fields = ('data', 'keyword', 'status')
+    search_fields = ('status',)
+    list_filter = [StatusListFilter, FaqCategoryListFilter, DivisionListFilter, 'created_by', 'modified_by']
+    json_list_fields = ('question',)
+    rendered_list_fields = ('question',)
+    summary_fields = HelpRecordModelAdmin.summary_fields + ('faq_category',)
 
     def category(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('category')
+            return obj.faq_category
 
     def question(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return mark_safe(raw_data.get('question'))
+            # Sanitized on save, the source is only shown for records not rendered yet
+            return mark_safe(obj.get_rendered_field('question') or obj.get_json_field('question'))
+
+    category.admin_order_field = 'faq_category'
+    question.admin_order_field = 'json_question'
 
     def save_model(self, request, obj, form, change):
-        extra_field = {field: form.cleaned_data[field].replace('\n', '').replace('\r', '').replace('\t', '') for field
-                       in form.fields if
-                       field in ('category', 'question', 'answer')}
+        extra_field = stripped_data(form, ('category', 'question', 'answer'))
         extra_field.update({'division': form.cleaned_data['division']})
         obj.data = json.dumps(extra_field)
         super().save_model(request, obj, form, change)
@@ -167,33 +479,37 @@ class ViewItemAdmin(HelpRecordModelAdmin):
               ('ensembl_action', 'ensembl_object'),
               ('created_by', 'created_at'),
               ('modified_by', 'modified_at'))
-    search_fields = ('data', 'keyword', 'status', 'helplink__page_url')
+    search_fields = ('status',)
+    summary_fields = HelpRecordModelAdmin.summary_fields + ('helplink__page_url',)
 
     def ensembl_action(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('ensembl_action', "")
+            return obj.json_data.get('ensembl_action', "")
 
     def ensembl_object(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('ensembl_object', "")
+            return obj.json_data.get('ensembl_object', "")
+
+    def get_queryset(self, request):
+        # Load the reverse one to one HelpLink along with the record, for list, change form and save
+        return super().get_queryset(request).select_related('helplink')
 
     def page_url(self, obj):
         if obj:
-            q = HelpLink.objects.filter(help_record_id=obj.help_record_id).first()
-            if q:
-                return q.page_url
+            help_link = obj.get_help_link()
+            if help_link:
+                return help_link.page_url
 
     def save_model(self, request, obj, form, change):
-        extra_field = {field: form.cleaned_data[field].replace('\n', '').replace('\r', '').replace('\t', '') for field
-                       in form.fields if field in ('content', 'ensembl_action', 'ensembl_object') if
-                       form.cleaned_data.get(field, False)}
+        extra_field = stripped_data(form, [field for field in ('content', 'ensembl_action', 'ensembl_object')
+                                           if form.cleaned_data.get(field, False)])
         obj.data = json.dumps(extra_field)
+        help_link = obj.get_help_link()
         super().save_model(request, obj, form, change)
-        q = HelpLink.objects.filter(help_record_id=obj.pk).first()
-        if not q:
-            HelpLink.objects.create(page_url=form.cleaned_data['help_link'], help_record_id=obj.pk)
+        if not help_link:
+            HelpLink.objects.create(page_url=form.cleaned_data['help_link'], help_record=obj)
+            # Index the new page url along with the content
+            HelpRecordSearch.objects.index([obj])
 
     page_url.admin_order_field = 'helplink__page_url'
     page_url.short_description = 'Help Links'
@@ -206,21 +522,80 @@ class LookupItemAdmin(HelpRecordModelAdmin):
     fields = ('word', 'expanded', 'meaning', 'keyword', 'status',
               ('created_by', 'created_at'),
               ('modified_by', 'modified_at'))
-    search_fields = ('data', 'keyword', 'status')
+    search_fields = ('status',)
+    json_list_fields = ('meaning',)
+    rendered_list_fields = ('meaning',)
+    summary_fields = HelpRecordModelAdmin.summary_fields + ('lookup_word',)
 
     def word(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return raw_data.get('word')
+            return obj.lookup_word
 
     def meaning(self, obj):
         if obj:
-            raw_data = json.loads(obj.data)
-            return mark_safe(raw_data.get('meaning'))
+            return mark_safe(obj.get_rendered_field('meaning') or obj.get_json_field('meaning'))
+
+    word.admin_order_field = 'lookup_word'
+    meaning.admin_order_field = 'json_meaning'
 
     def save_model(self, request, obj, form, change):
-        extra_field = {field: form.cleaned_data[field].replace('\n', '').replace('\r', '').replace('\t', '') for field
-                       in form.fields if
-                       field in ('word', 'expanded', 'meaning')}
+        extra_field = stripped_data(form, ('word', 'expanded', 'meaning'))
         obj.data = json.dumps(extra_field)
         super().save_model(request, obj, form, change)
+
+
+@admin.register(HelpRecordFeedbackRollup)
+class FeedbackAnalyticsAdmin(admin.ModelAdmin):
+    """
+    Helpfulness dashboard in place of the changelist: best and worst rated records, totals per type and division.
+    Aggregates only read the rollups, records are looked up by id for the displayed rows alone.
+    """
+    ranking_size = 20
+
+    def changelist_view(self, request, extra_context=None):
+        try:
+            days = max(int(request.GET.get('days', 30)), 1)
+            min_votes = max(int(request.GET.get('min_votes', 5)), 1)
+        except ValueError:
+            days, min_votes = 30, 5
+        since = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        rollups = HelpRecordFeedbackRollup.objects
+        ranked = rollups.totals('record', since).filter(votes__gte=min_votes)
+        top = list(ranked.order_by('-ratio', '-votes', 'key')[:self.ranking_size])
+        bottom = list(ranked.order_by('ratio', '-votes', 'key')[:self.ranking_size])
+        records = {str(pk): (record_type, keyword) for pk, record_type, keyword in HelpRecord.objects.filter(
+            pk__in=[int(row['key']) for row in top + bottom]).values_list('pk', 'type', 'keyword')}
+        for row in top + bottom:
+            record_type, keyword = records.get(row['key'], (None, None))
+            row['keyword'] = keyword
+            if record_type in HELP_RECORD_TYPES:
+                model_name = HELP_RECORD_TYPES[record_type]._meta.model_name
+                row['url'] = reverse('admin:ensembl_website_%s_change' % model_name, args=[row['key']])
+        context = dict(
+            self.admin_site.each_context(request),
+            title='Feedback analytics',
+            opts=self.model._meta,
+            days=days,
+            min_votes=min_votes,
+            top=top,
+            bottom=bottom,
+            types=rollups.totals('type', since),
+            divisions=rollups.totals('division', since),
+            **(extra_context or {}),
+        )
+        return TemplateResponse(request, 'admin/ensembl_website/feedback_analytics.html', context)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_staff
+
+    def has_module_permission(self, request):
+        return request.user.is_staff
@@ -0,0 +1,114 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Async variants of the public read endpoints, for ASGI deployments: database access and rendering run in worker
+threads, the event loop only waits on them, so that slow clients do not tie up a worker each.
+"""
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from ensembl.production.webhelp.glossary import glossary_version
+from ensembl.production.webhelp.models import HelpRecord
+from ensembl.production.webhelp.rendering import render_version
+from ensembl.production.webhelp.views import (PREVIEWS, HelpRecordListView, InvalidParameter, help_records_etag,
+                                              help_records_json, help_records_last_modified, help_records_page,
+                                              patch_help_records_cache, preview_context)
+
+
+def in_thread(func):
+    """
+    Awaitable running `func` in a worker thread, or in the main thread when `WEBHELP_ASYNC_THREAD_SENSITIVE`
+    (all database access serialized, for backends whose connections must stay on one thread).
+    """
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Pooled threads are never notified of the end of the request
+            close_old_connections()
+
+    thread_sensitive = getattr(settings, 'WEBHELP_ASYNC_THREAD_SENSITIVE', False)
+    return sync_to_async(func if thread_sensitive else run, thread_sensitive=thread_sensitive)
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    304 / 412 response when the client copy of the resource is still current, None otherwise.
+    """
+    return get_conditional_response(request, etag=quote_etag(etag) if etag else None,
+                                    last_modified=int(last_modified.timestamp()) if last_modified else None)
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = quote_etag(etag)
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+
+
+def help_record_page_response(request, pk):
+    record = HelpRecord.objects.filter(pk=pk, status='live').first()
+    if record is None:
+        raise Http404('No live help record %s' % pk)
+    etag = last_modified = None
+    if record.modified_at:
+        last_modified = record.modified_at
+        version = 'page:%s:%s:%s:%s' % (pk, last_modified.isoformat(), render_version(record.rendered),
+                                         glossary_version())
+        etag = hashlib.md5(version.encode()).hexdigest()
+    response = conditional_response(request, etag, last_modified)
+    if response is None:
+        context = dict(preview_context(record, PREVIEWS[record.type].content_field), object=record, helprecord=record)
+        response = HttpResponse(render_to_string('ensembl_website/helprecord_preview.html', context, request))
+    set_validators(response, etag, last_modified)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'WEBHELP_API_MAX_AGE', 300))
+    return response
+
+
+def help_records_response(request):
+    try:
+        etag, last_modified = help_records_etag(request), help_records_last_modified(request)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            records, next_url = help_records_page(request, HelpRecordListView.page_size,
+                                                  HelpRecordListView.max_page_size)
+            response = HttpResponse(''.join(help_records_json(records, next_url)), content_type='application/json')
+    except (InvalidParameter, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    set_validators(response, etag, last_modified)
+    patch_help_records_cache(request, response)
+    return response
+
+
+async def help_record_page(request, pk):
+    """
+    Html page of a live record, rendered as by its admin preview.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return await in_thread(help_record_page_response)(request, pk)
+
+
+async def help_records(request):
+    """
+    Async HelpRecordListView: same parameters, pagination and caching.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    return await in_thread(help_records_response)(request)
@@ -0,0 +1,48 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Storage size against encoding and decoding time of the `data` codecs, on the payloads of the current database.
+"""
+import json
+
+from ensembl.production.webhelp.benchmarks.suite import measure
+from ensembl.production.webhelp.compression import CODECS, decode_data, encode_data, zstandard
+from ensembl.production.webhelp.models import HelpRecord
+
+
+def available_codecs():
+    return [codec for codec in CODECS if codec != 'zstd' or zstandard is not None]
+
+
+def codec_results(repeat=5, log=None):
+    """
+    Stored size and time to encode / decode (to JSON) every payload, plain and with each available codec.
+    """
+    payloads = [decode_data(data) for data in HelpRecord.objects.values_list('data', flat=True).iterator()]
+    plain_size = sum(len(payload) for payload in payloads)
+    results = []
+    for codec in [None] + available_codecs():
+        stored = [encode_data(payload, codec) for payload in payloads] if codec else payloads
+        result = {
+            'codec': codec or 'none',
+            'records': len(payloads),
+            'stored_bytes': sum(len(value) for value in stored),
+            'encode_ms': measure(lambda i: [encode_data(payload, codec) for payload in payloads],
+                                 repeat)['median_ms'] if codec else 0.0,
+            'decode_ms': measure(lambda i: [json.loads(decode_data(value)) for value in stored],
+                                 repeat)['median_ms'],
+        }
+        result['ratio'] = round(result['stored_bytes'] / plain_size, 3) if plain_size else None
+        if log:
+            log(result)
+        results.append(result)
+    return results
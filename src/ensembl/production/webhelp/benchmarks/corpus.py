@@ -0,0 +1,121 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Synthetic help records corpus, shaped like the production content: CKEditor html of a few kB, help links for
+views, FAQ categories and divisions, lookup words.
+"""
+import json
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ensembl.production.webhelp.derived import refresh
+from ensembl.production.webhelp.forms import FAQ_CATEGORY
+from ensembl.production.webhelp.models import DIVISION_CHOICES, HelpLink, HelpRecord
+
+# Share of each record type in the corpus
+TYPE_SHARES = (('faq', 0.4), ('lookup', 0.3), ('view', 0.2), ('movie', 0.1))
+WORDS = (
+    'gene transcript protein variant allele assembly genome chromosome region sequence alignment orthologue '
+    'paralogue homology regulation feature annotation species strain exon intron promoter enhancer phenotype '
+    'database release download export upload biomart vep blast track browser karyotype location compara tree '
+    'family domain splice isoform canonical reference population frequency consequence motif peak marker'
+).split()
+OBJECTS = ('Gene', 'Transcript', 'Location', 'Variation', 'Regulation', 'Phenotype', 'Info')
+ACTIONS = ('Summary', 'Compara_Ortholog', 'Compara_Paralog', 'Sequence', 'Exons', 'Matches', 'Population')
+
+
+def sentence(rng, words):
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def html_document(rng, size):
+    """
+    CKEditor like html of about `size` characters: headings, paragraphs with inline markup and links, lists,
+    tables and image markup.
+    """
+    parts = ['<h1>%s</h1>' % sentence(rng, 4)[:-1]]
+    length = len(parts[0])
+    while length < size:
+        kind = rng.random()
+        if kind < 0.6:
+            words = [rng.choice(WORDS) for _ in range(rng.randint(20, 80))]
+            words[rng.randrange(len(words))] = '<strong>%s</strong>' % rng.choice(WORDS)
+            words[rng.randrange(len(words))] = '<a href="/Homo_sapiens/%s/%s">%s</a>' % (
+                rng.choice(OBJECTS), rng.choice(ACTIONS), rng.choice(WORDS))
+            part = '<p>%s</p>' % ' '.join(words)
+        elif kind < 0.8:
+            part = '<ul>%s</ul>' % ''.join('<li>%s</li>' % sentence(rng, rng.randint(4, 12))
+                                          for _ in range(rng.randint(2, 6)))
+        elif kind < 0.9:
+            part = '<table><tbody>%s</tbody></table>' % ''.join(
+                '<tr>%s</tr>' % ''.join('<td>%s</td>' % rng.choice(WORDS) for _ in range(4))
+                for _ in range(rng.randint(2, 5)))
+        else:
+            part = '<p>[[IMAGE::%s_%s.png width="%s" height="%s"]]</p>' % (
+                rng.choice(WORDS), rng.randint(1, 50), rng.randint(100, 800), rng.randint(100, 600))
+        parts.append(part)
+        length += len(part)
+    return '\r\n'.join(parts)
+
+
+def record_payload(rng, record_type, index):
+    if record_type == 'faq':
+        return {'category': rng.choice(FAQ_CATEGORY)[0], 'question': '<p>%s?</p>' % sentence(rng, 12)[:-1],
+                'answer': html_document(rng, rng.randint(1000, 6000)),
+                'division': rng.sample([division for division, _ in DIVISION_CHOICES], rng.choice((0, 0, 1, 2)))}
+    if record_type == 'lookup':
+        word = '%s%s' % (rng.choice(WORDS).upper(), index)
+        return {'word': word, 'expanded': sentence(rng, 5), 'meaning': html_document(rng, rng.randint(200, 1500))}
+    if record_type == 'view':
+        return {'content': html_document(rng, rng.randint(2000, 10000)), 'ensembl_object': rng.choice(OBJECTS),
+                'ensembl_action': rng.choice(ACTIONS)}
+    return {'title': sentence(rng, 5)[:-1], 'youtube_id': '%011x' % rng.getrandbits(44),
+            'youku_id': 'X%014x' % rng.getrandbits(56) if rng.random() < 0.3 else '',
+            'list_position': rng.randint(1, 100), 'length': '%s:%02d' % (rng.randint(1, 40), rng.randint(0, 59))}
+
+
+def generate_corpus(count, seed=0, batch_size=2000, using=None):
+    """
+    Create `count` records split between the types per TYPE_SHARES, their help links and derived data.
+    Returns the number of records created per type.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    types = [record_type for record_type, share in TYPE_SHARES for _ in range(round(share * 100))]
+    counts = {record_type: 0 for record_type, _ in TYPE_SHARES}
+    for start in range(0, count, batch_size):
+        records = []
+        for index in range(start, min(start + batch_size, count)):
+            record_type = rng.choice(types)
+            counts[record_type] += 1
+            records.append(HelpRecord(type=record_type, status=rng.choice(('live',) * 8 + ('draft', 'dead')),
+                                      keyword=', '.join(rng.sample(WORDS, 3)),
+                                      data=json.dumps(record_payload(rng, record_type, index)),
+                                      helpful=rng.randint(0, 50), not_helpful=rng.randint(0, 10)))
+        records = HelpRecord.objects.using(using).bulk_create(records)
+        if records[0].pk is None:
+            # Backends not returning the ids of bulk inserts
+            records = list(HelpRecord.objects.using(using).order_by('-pk')[:len(records)])[::-1]
+        for record in records:
+            # Spread over the last years instead of all at the time of the insert
+            record.created_at = now - timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60))
+            record.modified_at = record.created_at + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+        HelpRecord.objects.using(using).bulk_update(records, ['created_at', 'modified_at'])
+        HelpLink.objects.using(using).bulk_create([
+            HelpLink(help_record_id=record.pk, page_url='%s/%s_%s' % (
+                record.json_data['ensembl_object'], record.json_data['ensembl_action'], record.pk))
+            for record in records if record.type == 'view'])
+        refresh(records, using=using)
+    return counts
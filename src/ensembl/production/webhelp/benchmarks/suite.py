@@ -0,0 +1,132 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Timed scenarios of each help record admin: changelist pages, search, preview, change form initialization and
+save_model.
+"""
+import statistics
+import time
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.forms import CharField, CheckboxSelectMultiple
+from django.db import connections
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ensembl.production.webhelp.models import FaqRecord, LookupRecord, MovieRecord, ViewRecord
+
+ADMIN_MODELS = (FaqRecord, LookupRecord, MovieRecord, ViewRecord)
+SEARCH_TERM = 'ortholog'
+
+
+def measure(func, repeat, using='default'):
+    """
+    Timings in milliseconds and number of queries of `repeat` calls of `func`, given the call index.
+    """
+    timings = []
+    with CaptureQueriesContext(connections[using]) as queries:
+        for i in range(repeat):
+            start = time.perf_counter()
+            func(i)
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(timings), 2),
+        'median_ms': round(statistics.median(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': len(queries) // repeat,
+    }
+
+
+def get(client, url, params=None):
+    response = client.get(url, params)
+    if response.status_code != 200:
+        raise AssertionError('GET %s %s: %s' % (url, params or '', response.status_code))
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+def form_data(form):
+    """
+    POST data of an unbound admin form, as submitted unchanged by the browser.
+    """
+    data = {}
+    for name, field in form.fields.items():
+        value = form[name].value()
+        if isinstance(field.widget, CheckboxSelectMultiple):
+            data[name] = list(value or [])
+        elif value is not None:
+            data[name] = value
+    return data
+
+
+def admin_scenarios(model, user, sample_size):
+    """
+    Scenario name -> callable of the call index, for the admin of `model`.
+    """
+    model_admin = admin.site._registry[model]
+    client = Client()
+    client.force_login(user)
+    info = model._meta.app_label, model._meta.model_name
+    changelist_url = reverse('admin:%s_%s_changelist' % info)
+    last_page = max(model.objects.count() // model_admin.list_per_page, 1)
+    samples = list(model.objects.filter(status='live').order_by('?').values_list('pk', flat=True)[:sample_size])
+    request = RequestFactory().get(changelist_url)
+    request.user = user
+
+    def change_form(i):
+        obj = model_admin.get_object(request, str(samples[i % len(samples)]))
+        return obj, model_admin.get_form(request, obj, change=True)(instance=obj)
+
+    def save(i):
+        obj, form = change_form(i)
+        data = form_data(form)
+        for name, field in form.fields.items():
+            # Rows loaded outside of the admin (e.g. fixtures) may lack required text
+            if field.required and isinstance(field, CharField) and not data.get(name):
+                data[name] = 'benchmark'
+        bound = model_admin.get_form(request, obj, change=True)(data, instance=obj)
+        if not bound.is_valid():
+            raise AssertionError('Invalid %s form: %s' % (model._meta.model_name, bound.errors.as_text()))
+        model_admin.save_model(request, bound.save(commit=False), bound, True)
+
+    def preview(i):
+        cache.clear()
+        get(client, reverse('admin:%s_%s_preview' % info, args=[samples[i % len(samples)]]))
+
+    return {
+        'changelist': lambda i: get(client, changelist_url),
+        'changelist_last_page': lambda i: get(client, changelist_url, {'p': last_page}),
+        'changelist_sorted': lambda i: get(client, changelist_url, {'o': '1'}),
+        'search': lambda i: get(client, changelist_url, {'q': SEARCH_TERM}),
+        'preview': preview,
+        'form_init': change_form,
+        'save_model': save,
+    }
+
+
+def run_suite(user, repeat=5, models=ADMIN_MODELS, log=None):
+    """
+    Run every scenario of every admin `repeat` times, returns one result per (admin, scenario).
+    """
+    results = []
+    for model in models:
+        for name, scenario in admin_scenarios(model, user, repeat).items():
+            # Warm up caches (templates, content types) before timing
+            scenario(0)
+            result = dict(admin=model._meta.model_name, scenario=name, repeat=repeat, **measure(scenario, repeat))
+            if log:
+                log(result)
+            results.append(result)
+    return results
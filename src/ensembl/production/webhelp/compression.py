@@ -0,0 +1,107 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Optional compressed storage of the `help_record.data` payloads, enabled with `WEBHELP_DATA_COMPRESSION` ('zlib', or
+'zstd' with the zstandard package). Compressed values are stored as `<codec>:<base64>` text, plain JSON rows written
+before (or below `WEBHELP_DATA_COMPRESSION_MIN_SIZE`) stay readable as is. Payloads are decoded on access only,
+see HelpRecord.json_data.
+"""
+import base64
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encoded values start with `<codec>:`, JSON documents can not
+MARKER = ':'
+
+
+def zstd_compress(data):
+    return zstandard.ZstdCompressor(level=9).compress(data)
+
+
+def zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# name: (compress, decompress) of bytes
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'zstd': (zstd_compress, zstd_decompress),
+}
+
+
+def data_codec():
+    """
+    Codec new payloads are written with, None when compression is off.
+    """
+    codec = getattr(settings, 'WEBHELP_DATA_COMPRESSION', None)
+    if codec is None:
+        return None
+    if codec not in CODECS:
+        raise ImproperlyConfigured('WEBHELP_DATA_COMPRESSION must be one of %s' % ', '.join(CODECS))
+    if codec == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured('WEBHELP_DATA_COMPRESSION zstd requires the zstandard package')
+    return codec
+
+
+def encoded_codec(value):
+    """
+    Codec `value` was encoded with, None for plain text.
+    """
+    if not value:
+        return None
+    codec = value.split(MARKER, 1)[0]
+    return codec if codec in CODECS and len(codec) < len(value) else None
+
+
+def encode_data(value, codec=None):
+    """
+    `value` compressed with `codec` (default: the configured one) when large enough, as is otherwise or when it is
+    already encoded.
+    """
+    codec = codec or data_codec()
+    if codec is None or value is None or encoded_codec(value):
+        return value
+    if len(value) < getattr(settings, 'WEBHELP_DATA_COMPRESSION_MIN_SIZE', 256):
+        return value
+    compress = CODECS[codec][0]
+    return codec + MARKER + base64.b64encode(compress(value.encode())).decode('ascii')
+
+
+def decode_data(value):
+    """
+    Plain text of a stored payload, whatever its codec.
+    """
+    codec = encoded_codec(value)
+    if codec is None:
+        return value
+    if codec == 'zstd' and zstandard is None:
+        raise ImproperlyConfigured('Reading zstd compressed help records requires the zstandard package')
+    decompress = CODECS[codec][1]
+    return decompress(base64.b64decode(value[len(codec) + 1:])).decode()
+
+
+class CompressedTextField(models.TextField):
+    """
+    TextField compressing written values with the configured codec. Read values are left encoded, to be decoded
+    with `decode_data` only when needed.
+    """
+
+    def get_prep_value(self, value):
+        return encode_data(super().get_prep_value(value))
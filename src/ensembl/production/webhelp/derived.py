@@ -0,0 +1,32 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Data derived from help records.
+HelpRecord.save keeps it up to date, paths bypassing save (bulk import, backfill) rebuild it with `refresh`.
+"""
+from ensembl.production.webhelp.models import HelpRecord, HelpRecordKeyword, HelpRecordSearch
+
+STEPS = {
+    'fields': lambda records, using=None: HelpRecord.objects.refresh_shadow_fields(records, using=using),
+    'keywords': lambda records, using=None: HelpRecordKeyword.objects.index(records, using=using),
+    'search': lambda records, using=None: HelpRecordSearch.objects.index(records, using=using),
+    'rendered': lambda records, using=None: HelpRecord.objects.refresh_rendered(records, using=using),
+}
+
+
+def refresh(records, steps=None, using=None):
+    """
+    Rebuild the derived data `steps` (default: all) of `records`.
+    """
+    records = list(records)
+    for step in steps or STEPS:
+        STEPS[step](records, using=using)
@@ -0,0 +1,126 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ensembl.production.webhelp.models import HelpRecord, HelpRecordFeedbackRollup
+
+logger = logging.getLogger(__name__)
+
+
+class FeedbackBuffer:
+    """
+    Helpful / not helpful votes accumulated in memory and written as one UPDATE per record on flush, instead of a
+    read-modify-write per vote fighting for the row lock of popular records. Flushes also add the votes to the
+    hourly and daily rollups.
+    Flushed every `WEBHELP_FEEDBACK_FLUSH_INTERVAL` seconds (default 10) by a background thread, and on
+    interpreter exit. Votes are only lost if the process is killed without exiting.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._votes = {}
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def add(self, help_record_id, helpful, voted_at=None):
+        hour = (voted_at or timezone.now()).replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            counts = self._votes.setdefault((help_record_id, hour), [0, 0])
+            counts[0 if helpful else 1] += 1
+            if self._thread is None:
+                self._start()
+
+    def pending(self):
+        """
+        Buffered (helpful, not helpful) votes per record.
+        """
+        with self._lock:
+            return self._per_record(self._votes)
+
+    @staticmethod
+    def _per_record(votes):
+        totals = {}
+        for (pk, _), (helpful, not_helpful) in votes.items():
+            counts = totals.setdefault(pk, (0, 0))
+            totals[pk] = (counts[0] + helpful, counts[1] + not_helpful)
+        return totals
+
+    def flush(self, using=None):
+        """
+        Write the buffered votes, returns the number of records updated.
+        Votes are put back in the buffer for the next flush if they could not be written.
+        """
+        with self._lock:
+            votes, self._votes = self._votes, {}
+        if not votes:
+            return 0
+        totals = self._per_record(votes)
+        try:
+            with transaction.atomic(using=using):
+                for pk in sorted(totals):
+                    # Sorted: concurrent flushes from other processes lock the rows in the same order
+                    helpful, not_helpful = totals[pk]
+                    changes = {}
+                    if helpful:
+                        changes['helpful'] = Coalesce(F('helpful'), Value(0)) + helpful
+                    if not_helpful:
+                        changes['not_helpful'] = Coalesce(F('not_helpful'), Value(0)) + not_helpful
+                    HelpRecord.objects.using(using).filter(pk=pk).update(**changes)
+                HelpRecordFeedbackRollup.objects.add(votes, using)
+        except BaseException:
+            self._restore(votes)
+            raise
+        return len(totals)
+
+    def _restore(self, votes):
+        with self._lock:
+            for key, (helpful, not_helpful) in votes.items():
+                counts = self._votes.setdefault(key, [0, 0])
+                counts[0] += helpful
+                counts[1] += not_helpful
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='webhelp-feedback-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        interval = self.interval or getattr(settings, 'WEBHELP_FEEDBACK_FLUSH_INTERVAL', 10)
+        while not self._stopped.wait(interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Feedback flush failed, votes kept for the next one')
+            finally:
+                # The thread's own connections, not the request ones
+                connections.close_all()
+
+    def stop(self):
+        """
+        Stop the flush thread and write what is left.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+feedback_buffer = FeedbackBuffer()
@@ -0,0 +1,98 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+from django.contrib import admin
+from django.db.models import Count, Q
+
+from ensembl.production.webhelp.forms import FAQ_CATEGORY
+from ensembl.production.webhelp.models import DIVISION_CHOICES, HelpRecord
+
+
+class FacetListFilter(admin.SimpleListFilter):
+    """
+    List filter on `facet_field` showing the number of records for each choice, among the records selected by
+    the other filters and the search. The counts of all the facet filters of a changelist come from a single
+    aggregate query, see `facet_counts`.
+    """
+    facet_field = None
+    facet_choices = ()
+
+    def __init__(self, request, params, model, model_admin):
+        self.request = request
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return self.facet_choices
+
+    def choices(self, changelist):
+        counts = facet_counts(changelist, self.request).get(self.parameter_name, {})
+        self.lookup_choices = [(value, '%s (%s)' % (label, counts.get(value, 0)))
+                               for value, label in self.facet_choices]
+        yield from super().choices(changelist)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.facet_field: self.value()})
+        return queryset
+
+
+def facet_counts(changelist, request):
+    """
+    {parameter name: {value: count}} of the facet filters of `changelist`, computed once per changelist.
+    Each value is counted as a conditional COUNT(DISTINCT) over the changelist results without the facet filters,
+    restricted to the choices of the other facets: one aggregate query for all of them.
+    """
+    if not hasattr(changelist, '_facet_counts'):
+        facets = [spec for spec in changelist.filter_specs if isinstance(spec, FacetListFilter)]
+        # get_queryset rebuilds the filters of the changelist, they are kept as displayed
+        saved = (changelist.params, changelist.filter_specs, changelist.has_filters, changelist.has_active_filters)
+        changelist.params = {name: value for name, value in changelist.params.items()
+                             if name not in {facet.parameter_name for facet in facets}}
+        try:
+            queryset = changelist.get_queryset(request)
+        finally:
+            (changelist.params, changelist.filter_specs, changelist.has_filters,
+             changelist.has_active_filters) = saved
+        aggregates = {}
+        for i, facet in enumerate(facets):
+            others = Q(*[Q(**{other.facet_field: other.value()}) for other in facets
+                         if other is not facet and other.value()])
+            for j, (value, _) in enumerate(facet.facet_choices):
+                aggregates['facet_%s_%s' % (i, j)] = Count('pk', distinct=True,
+                                                          filter=Q(**{facet.facet_field: value}) & others)
+        counts = queryset.order_by().aggregate(**aggregates) if aggregates else {}
+        changelist._facet_counts = {
+            facet.parameter_name: {value: counts['facet_%s_%s' % (i, j)]
+                                   for j, (value, _) in enumerate(facet.facet_choices)}
+            for i, facet in enumerate(facets)
+        }
+    return changelist._facet_counts
+
+
+class StatusListFilter(FacetListFilter):
+    title = 'status'
+    parameter_name = 'status'
+    facet_field = 'status'
+    facet_choices = HelpRecord._meta.get_field('status').choices
+
+
+class FaqCategoryListFilter(FacetListFilter):
+    title = 'category'
+    parameter_name = 'category'
+    facet_field = 'faq_category'
+    facet_choices = FAQ_CATEGORY
+
+
+class DivisionListFilter(FacetListFilter):
+    title = 'division'
+    parameter_name = 'division'
+    facet_field = 'divisions__division'
+    facet_choices = DIVISION_CHOICES
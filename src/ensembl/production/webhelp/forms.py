@@ -9,12 +9,13 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-import json
-
 from ckeditor.widgets import CKEditorWidget
 from django import forms
+from django.contrib.admin.helpers import ActionForm
 
-from ensembl.production.webhelp.models import DIVISION_CHOICES, HelpLink
+from ensembl.production.webhelp.images import missing_images
+from ensembl.production.webhelp.models import DIVISION_CHOICES
+from ensembl.production.webhelp.rendering import image_names
 
 FAQ_CATEGORY = (
     ('archives', 'Archives'),
@@ -34,12 +35,35 @@ FAQ_CATEGORY = (
 )
 
 
+class HelpRecordActionForm(ActionForm):
+    # Argument of the add / remove keyword actions
+    keyword = forms.CharField(required=False, max_length=255,
+                              widget=forms.TextInput(attrs={'placeholder': 'Keyword'}))
+
+
 class WebSiteRecordForm(forms.ModelForm):
     class Meta:
         exclude = ('type', 'data')
 
 
-class LookupItemForm(WebSiteRecordForm):
+class HelpImagesMixin:
+    """
+    Rejects the IMAGE markup of `image_fields` naming images missing from `WEBHELP_IMAGE_ROOT`, when set.
+    """
+    image_fields = ()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.image_fields:
+            missing = missing_images(image_names(cleaned_data.get(field) or ''))
+            if missing:
+                self.add_error(field, 'Unknown help image%s: %s'
+                               % ('s' if len(missing) > 1 else '', ', '.join(missing)))
+        return cleaned_data
+
+
+class LookupItemForm(HelpImagesMixin, WebSiteRecordForm):
+    image_fields = ('meaning',)
     word = forms.CharField(label='Word')
     keyword = forms.CharField(widget=forms.Textarea({'rows': 3}))
     expanded = forms.CharField(label='Expanded', required=False, widget=forms.Textarea({'rows': 3}))
@@ -51,7 +75,7 @@ class LookupItemForm(WebSiteRecordForm):
         if 'instance' in kwargs and kwargs['instance'] is not None:
             if 'initial' not in kwargs:
                 kwargs['initial'] = {}
-                data = json.loads(kwargs['instance'].data)
+                data = kwargs['instance'].json_data
                 kwargs['initial'].update(
                     {'word': data.get('word', ""), 'meaning': data.get('meaning', ""),
                      'expanded': data.get('expanded', "")})
@@ -72,7 +96,7 @@ class MovieForm(WebSiteRecordForm):
         if 'instance' in kwargs and kwargs['instance'] is not None:
             if 'initial' not in kwargs:
                 kwargs['initial'] = {}
-                data = json.loads(kwargs['instance'].data)
+                data = kwargs['instance'].json_data
                 initial = {'title': data.get('title', ""), 'list_position': data.get('list_position', ""),
                            'youtube_id': data.get('youtube_id', ""), 'youku_id': data.get('youku_id', ""),
                            'length': data.get('length', "")}
@@ -80,7 +104,8 @@ class MovieForm(WebSiteRecordForm):
         super(MovieForm, self).__init__(*args, **kwargs)
 
 
-class FaqForm(WebSiteRecordForm):
+class FaqForm(HelpImagesMixin, WebSiteRecordForm):
+    image_fields = ('question', 'answer')
     category = forms.CharField(label="Category", widget=forms.Select(choices=FAQ_CATEGORY))
     question = forms.CharField(label="Question", widget=CKEditorWidget())
     answer = forms.CharField(label="Answer", widget=CKEditorWidget())
@@ -94,14 +119,15 @@ class FaqForm(WebSiteRecordForm):
         if 'instance' in kwargs and kwargs['instance'] is not None:
             if 'initial' not in kwargs:
                 kwargs['initial'] = {}
-                data = json.loads(kwargs['instance'].data)
+                data = kwargs['instance'].json_data
                 kwargs['initial'].update(
                     {'category': data.get('category', ""), 'question': data.get('question', ""),
                      'answer': data.get('answer', ""), 'division': data.get('division', "")})
         super(FaqForm, self).__init__(*args, **kwargs)
 
 
-class ViewForm(WebSiteRecordForm):
+class ViewForm(HelpImagesMixin, WebSiteRecordForm):
+    image_fields = ('content',)
     content = forms.CharField(label="Content", widget=CKEditorWidget())
     help_link = forms.CharField(label="Linked URLs")
     ensembl_action = forms.CharField(label="Ensembl Action", required=False, help_text="Associated action")
@@ -114,11 +140,12 @@ class ViewForm(WebSiteRecordForm):
         if 'instance' in kwargs and kwargs['instance'] is not None:
             if 'initial' not in kwargs:
                 kwargs['initial'] = {}
-                help_link = HelpLink.objects.filter(help_record_id=kwargs['instance'].pk).first()
-                data = json.loads(kwargs['instance'].data)
+                help_link = kwargs['instance'].get_help_link()
+                data = kwargs['instance'].json_data
                 kwargs['initial'].update(
                     {'content': data.get('content', ""), 'ensembl_action': data.get('ensembl_action', ""),
-                     'ensembl_object': data.get('ensembl_object', ""), 'help_link': help_link.page_url})
+                     'ensembl_object': data.get('ensembl_object', ""),
+                     'help_link': help_link.page_url if help_link else ""})
                 super(ViewForm, self).__init__(*args, **kwargs)
                 self.fields['help_link'].widget.attrs['readonly'] = True
             else:
@@ -0,0 +1,227 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Glossary terms (live LookupRecord words) linked to their definition in FAQ answers and View content.
+All words are compiled in a single Aho-Corasick automaton, so annotating a document is one pass over its text
+whatever the size of the glossary. The automaton is kept per process and rebuilt when a lookup changes.
+"""
+import html
+import re
+from collections import deque
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils.html import escape, strip_tags
+
+from ensembl.production.webhelp.models import LookupRecord
+
+# `data` keys annotated with glossary links, per record type
+GLOSSARY_FIELDS = {
+    'faq': ('answer',),
+    'view': ('content',),
+}
+# Shorter words match too often by chance
+MIN_TERM_LENGTH = 2
+# Text within these tags is never linked
+SKIPPED_TAGS = {'a', 'code', 'pre', 'script', 'style', 'textarea'}
+TAG = re.compile(r'(<!--.*?-->|<[^>]*>)', re.S)
+TAG_NAME = re.compile(r'</?\s*([a-zA-Z0-9]+)')
+ENTITY = re.compile(r'&#?[a-zA-Z0-9]+;')
+
+_glossaries = {}
+
+
+class GlossaryMatcher:
+    """
+    Aho-Corasick automaton of the glossary `terms`, {word: value}, matched case insensitively on whole words.
+    """
+
+    def __init__(self, terms):
+        # Trie transitions, failure links and (length, value) of the terms ending at each state, longest first
+        self.transitions = [{}]
+        self.failures = [0]
+        self.outputs = [[]]
+        # Values of the compiled terms, by folded word
+        self.terms = {}
+        for word, value in terms.items():
+            word = fold(word.strip())
+            if len(word) < MIN_TERM_LENGTH:
+                continue
+            state = 0
+            for char in word:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.failures.append(0)
+                    self.outputs.append([])
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.terms[word] = value
+            self.outputs[state] = [(len(word), value)]
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.transitions[state].items():
+                queue.append(target)
+                failure = self.failures[state]
+                while failure and char not in self.transitions[failure]:
+                    failure = self.failures[failure]
+                self.failures[target] = self.transitions[failure].get(char, 0)
+                self.outputs[target] = self.outputs[target] + self.outputs[self.failures[target]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def find(self, text):
+        """
+        (start, end, value) of the leftmost longest, non overlapping, whole word terms in `text`.
+        """
+        folded = fold(text)
+        candidates = []
+        state = 0
+        for end, char in enumerate(folded, 1):
+            while state and char not in self.transitions[state]:
+                state = self.failures[state]
+            state = self.transitions[state].get(char, 0)
+            for length, value in self.outputs[state]:
+                start = end - length
+                if is_boundary(text, start) and is_boundary(text, end):
+                    candidates.append((start, -end, value))
+        matches = []
+        position = 0
+        for start, end, value in sorted(candidates, key=lambda candidate: candidate[:2]):
+            if start >= position:
+                matches.append((start, -end, value))
+                position = -end
+        return matches
+
+
+def fold(text):
+    # Case folding keeping offsets: characters whose lower case is longer are left as is
+    return ''.join(char if len(char.lower()) != 1 else char.lower() for char in text)
+
+
+def is_boundary(text, position):
+    return position <= 0 or position >= len(text) or not (text[position - 1].isalnum() and text[position].isalnum())
+
+
+def glossary_version(using=None):
+    """
+    Version of the glossary: any lookup saved, added, removed or (un)published changes it.
+    """
+    version = LookupRecord.objects.using(using).filter(status='live').aggregate(
+        count=Count('pk'), modified_at=Max('modified_at'))
+    return '%s:%s' % (version['count'], version['modified_at'].isoformat() if version['modified_at'] else '')
+
+
+def glossary_url(pk, word):
+    """
+    Link to the definition of a term: `WEBHELP_GLOSSARY_URL` formatted with the lookup `id` and url quoted `word`,
+    the public page of the lookup by default.
+    """
+    url = getattr(settings, 'WEBHELP_GLOSSARY_URL', None)
+    if url:
+        return url % {'id': pk, 'word': quote(word)}
+    return reverse('ensembl_webhelp:help_record_page', args=[pk])
+
+
+def build_glossary(using=None):
+    """
+    Matcher of the live Lookup words, to (id, word, title) where the title is the expanded word or its meaning.
+    """
+    terms = {}
+    for lookup in LookupRecord.objects.using(using).filter(status='live').order_by('pk'):
+        word = lookup.json_data.get('word') or ''
+        title = lookup.json_data.get('expanded') or html.unescape(strip_tags(lookup.json_data.get('meaning') or ''))
+        terms[word] = (lookup.pk, word, ' '.join(title.split())[:200])
+    return GlossaryMatcher(terms)
+
+
+def get_glossary(using=None):
+    """
+    Matcher of the live glossary, rebuilt only when its version changed since the last call in this process.
+    """
+    version = glossary_version(using)
+    cached = _glossaries.get(using)
+    if cached is None or cached[0] != version:
+        cached = _glossaries[using] = (version, build_glossary(using))
+    return cached[1]
+
+
+def tag_name(tag):
+    match = TAG_NAME.match(tag)
+    return match.group(1).lower() if match else None
+
+
+def text_matches(text, glossary):
+    # Terms within character references (&amp; ...) are not words of the text
+    entities = [match.span() for match in ENTITY.finditer(text)]
+    return [(start, end, value) for start, end, value in glossary.find(text)
+            if not any(start < right and left < end for left, right in entities)]
+
+
+def link_text(text, glossary, linked):
+    parts = []
+    position = 0
+    for start, end, (pk, word, title) in text_matches(text, glossary):
+        # Only the first occurrence of each term is linked
+        if pk in linked:
+            continue
+        linked.add(pk)
+        parts.append(text[position:start])
+        parts.append('<a class="glossary" href="%s" title="%s">%s</a>' % (
+            escape(glossary_url(pk, word)), escape(title), text[start:end]))
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def text_parts(content):
+    """
+    Parts of the `content` html, as (part, linkable): tags, and text within links or code, are not linkable.
+    """
+    skipped = []
+    for i, part in enumerate(TAG.split(content)):
+        if i % 2:
+            name = tag_name(part)
+            if name in SKIPPED_TAGS and not part.endswith('/>'):
+                if not part.startswith('</'):
+                    skipped.append(name)
+                elif name in skipped:
+                    skipped.remove(name)
+            yield part, False
+        else:
+            yield part, not skipped and bool(part.strip())
+
+
+def link_glossary(content, glossary):
+    """
+    `content` html with the glossary terms of its text linked to their definition, outside of existing links
+    and code.
+    """
+    if not content or not len(glossary):
+        return content
+    linked = set()
+    return ''.join(link_text(part, glossary, linked) if linkable else part
+                   for part, linkable in text_parts(content))
+
+
+def glossary_matches(content, glossary):
+    """
+    Ids of the lookups whose term is found in the linkable text of the `content` html.
+    """
+    found = set()
+    for part, linkable in text_parts(content or ''):
+        if linkable:
+            found.update(pk for _, _, (pk, _, _) in text_matches(part, glossary))
+    return found
@@ -0,0 +1,88 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Help images served from a local directory, `WEBHELP_IMAGE_ROOT` (e.g. a checkout of ensembl-webcode
+htdocs/img/help), with thumbnails at the size requested by the IMAGE markup, generated once and cached in
+`WEBHELP_IMAGE_CACHE_DIR`. Thumbnails need Pillow, without it the original image is served.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Larger requested sizes are served from the original image
+MAX_THUMBNAIL_SIZE = 2000
+
+
+def image_root():
+    return getattr(settings, 'WEBHELP_IMAGE_ROOT', None)
+
+
+def image_path(name):
+    """
+    Path of the help image `name`, None when it does not exist or no image directory is configured.
+    """
+    root = image_root()
+    if not root or not name or name.startswith('.') or os.path.basename(name) != name:
+        return None
+    path = os.path.join(root, name)
+    return path if os.path.isfile(path) else None
+
+
+def missing_images(names):
+    """
+    Names in `names` without an image file, empty when no image directory is configured.
+    """
+    if not image_root():
+        return []
+    return sorted(set(name for name in names if image_path(name) is None))
+
+
+def thumbnail_path(name, width, height):
+    """
+    Path of the `width` x `height` version of the image `name` (aspect ratio kept within the box), generated when
+    missing or older than the image. The original image path when it can not be resized.
+    """
+    path = image_path(name)
+    if path is None or Image is None or not (0 < width <= MAX_THUMBNAIL_SIZE and 0 < height <= MAX_THUMBNAIL_SIZE):
+        return path
+    cache_dir = getattr(settings, 'WEBHELP_IMAGE_CACHE_DIR', None) or os.path.join(tempfile.gettempdir(),
+                                                                                  'webhelp-thumbnails')
+    root, extension = os.path.splitext(name)
+    cached = os.path.join(cache_dir, '%s_%sx%s%s' % (root, width, height, extension))
+    if os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+        return cached
+    try:
+        with Image.open(path) as image:
+            if image.width <= width and image.height <= height:
+                return path
+            image_format = image.format
+            image.thumbnail((width, height))
+            os.makedirs(cache_dir, exist_ok=True)
+            # Written aside then moved, concurrent requests never read a partial file
+            handle, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp', suffix=extension)
+            os.close(handle)
+            try:
+                image.save(tmp_path, format=image_format)
+                os.replace(tmp_path, cached)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+    except (OSError, ValueError):
+        # Not an image Pillow can resize (svg, ...)
+        return path
+    return cached
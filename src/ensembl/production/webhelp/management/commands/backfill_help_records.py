@@ -0,0 +1,41 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ensembl.production.webhelp.derived import STEPS, refresh
+from ensembl.production.webhelp.models import HelpRecord
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the data derived from help records (search index, ...) for existing rows, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', choices=sorted(STEPS),
+                            help='Step to run, can be repeated (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Records per transaction')
+
+    def handle(self, *args, **options):
+        steps = options['only'] or list(STEPS)
+        last_id = 0
+        total = 0
+        while True:
+            # Seek on the primary key rather than slicing, so that every batch costs the same
+            records = list(HelpRecord.objects.filter(pk__gt=last_id).order_by('pk')[:options['batch_size']])
+            if not records:
+                break
+            with transaction.atomic():
+                refresh(records, steps)
+            last_id = records[-1].pk
+            total += len(records)
+            self.stdout.write('Processed %s records' % total)
+        self.stdout.write(self.style.SUCCESS('Backfilled %s on %s records' % (', '.join(steps), total)))
@@ -0,0 +1,79 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import json
+import platform
+import time
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from ensembl.production.webhelp.benchmarks.compression import codec_results
+from ensembl.production.webhelp.benchmarks.corpus import generate_corpus
+from ensembl.production.webhelp.benchmarks.suite import run_suite
+from ensembl.production.webhelp.models import HelpRecord
+
+VERSION_FILE = Path(__file__).resolve().parents[6] / 'VERSION'
+
+
+class Command(BaseCommand):
+    help = 'Time the help records admin and views on a synthetic corpus, created in a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=100000, help='Synthetic records to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs of each scenario')
+        parser.add_argument('--seed', type=int, default=0, help='Corpus random seed')
+        parser.add_argument('--fixture', help='Load this fixture (e.g. webhelp) as corpus instead of generating one')
+        parser.add_argument('--output', default='benchmark.json', help='JSON results file')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the test database, and its corpus, for the next run')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS('Results written to %s' % options['output']))
+
+    def run(self, options):
+        start = time.perf_counter()
+        if options['fixture']:
+            call_command('loaddata', options['fixture'], verbosity=0)
+            call_command('backfill_help_records', stdout=self.stdout)
+        elif not (options['keepdb'] and HelpRecord.objects.exists()):
+            generate_corpus(options['records'], options['seed'])
+        corpus = dict(HelpRecord.objects.values_list('type').annotate(count=django.db.models.Count('pk')))
+        self.stdout.write('Corpus %s ready in %.1fs' % (corpus, time.perf_counter() - start))
+        user, _ = get_user_model().objects.get_or_create(username='benchmark', defaults={
+            'is_staff': True, 'is_superuser': True})
+        return {
+            'version': VERSION_FILE.read_text().strip() if VERSION_FILE.exists() else None,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'corpus': corpus,
+            'results': run_suite(user, options['repeat'], log=lambda result: self.stdout.write(
+                '%(admin)s %(scenario)s: %(median_ms)sms, %(queries)s queries' % result)),
+            'compression': codec_results(options['repeat'], log=lambda result: self.stdout.write(
+                'data %(codec)s: %(stored_bytes)s bytes (%(ratio)s), encode %(encode_ms)sms, '
+                'decode %(decode_ms)sms' % result)),
+        }
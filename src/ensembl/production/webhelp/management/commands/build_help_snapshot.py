@@ -0,0 +1,42 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from ensembl.production.webhelp.glossary import build_glossary
+from ensembl.production.webhelp.snapshot import build_snapshot, init_worker
+
+
+class Command(BaseCommand):
+    help = 'Render the live help records to static html pages and JSON bundles, only the ones changed since the ' \
+           'last snapshot of the output directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Snapshot directory')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                            help='Rendering worker processes, 1 renders in this process (default: CPU count)')
+        parser.add_argument('--full', action='store_true', help='Render every record again, e.g. after a template '
+                                                                'change')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Records loaded from the database at once')
+
+    def handle(self, *args, **options):
+        if options['processes'] > 1:
+            glossary = build_glossary()
+            with ProcessPoolExecutor(options['processes'], initializer=init_worker,
+                                     initargs=(glossary,)) as executor:
+                counts = build_snapshot(options['output'], executor, options['full'], options['chunk_size'],
+                                        glossary)
+        else:
+            counts = build_snapshot(options['output'], None, options['full'], options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('Rendered %s records, removed %s, %s unchanged' % counts))
@@ -0,0 +1,61 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from ensembl.production.webhelp.compression import CODECS, data_codec, decode_data, encode_data
+from ensembl.production.webhelp.models import HelpRecord, forget_compressed_data
+
+
+class Command(BaseCommand):
+    help = ('Rewrite the stored help record payloads with a codec (default: WEBHELP_DATA_COMPRESSION), '
+            'in short batches so that the admin stays usable meanwhile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--codec', choices=sorted(CODECS) + ['none'],
+                            help='Codec to store the payloads with, none to decompress them (default: configured)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Records per transaction')
+
+    def handle(self, *args, **options):
+        configured = data_codec()
+        codec = options['codec'] or configured
+        if codec in (None, 'none'):
+            if configured is not None:
+                raise CommandError('Unset WEBHELP_DATA_COMPRESSION before decompressing, saved payloads would be '
+                                   'compressed again')
+            codec = None
+        last_id = 0
+        total = changed = size_before = size_after = 0
+        while True:
+            # Seek on the primary key rather than slicing, so that every batch costs the same
+            rows = list(HelpRecord.objects.filter(pk__gt=last_id).order_by('pk').values_list(
+                'pk', 'data')[:options['batch_size']])
+            if not rows:
+                break
+            records = []
+            for pk, data in rows:
+                stored = encode_data(decode_data(data), codec) if codec else decode_data(data)
+                size_before += len(data or '')
+                size_after += len(stored or '')
+                if stored != data:
+                    records.append(HelpRecord(pk=pk, data=stored))
+            with transaction.atomic():
+                # modified_at is left as is: the content does not change
+                HelpRecord.objects.bulk_update(records, ['data'])
+            last_id = rows[-1][0]
+            total += len(rows)
+            changed += len(records)
+            self.stdout.write('Processed %s records' % total)
+        # The database reads the payloads again once none is left compressed
+        forget_compressed_data(connection)
+        self.stdout.write(self.style.SUCCESS('Rewrote %s of %s records with %s, %s bytes stored instead of %s' % (
+            changed, total, codec or 'no compression', size_after, size_before)))
@@ -0,0 +1,65 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ensembl.production.webhelp.compression import decode_data
+from ensembl.production.webhelp.models import HELP_RECORD_TYPES, HelpLink, HelpRecord
+
+RECORD_FIELDS = ('created_by', 'created_at', 'modified_by', 'modified_at', 'type', 'keyword', 'data', 'status',
+                 'helpful', 'not_helpful')
+
+
+class Command(BaseCommand):
+    help = 'Export help records and their help links as NDJSON, one object per line, records first.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Output file (default: stdout)')
+        parser.add_argument('--type', action='append', choices=sorted(HELP_RECORD_TYPES),
+                            help='Record type to export, can be repeated (default: all)')
+        parser.add_argument('--status', action='append', choices=['draft', 'live', 'dead'],
+                            help='Record status to export, can be repeated (default: all)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at once')
+
+    def handle(self, *args, **options):
+        records = HelpRecord.objects.order_by('pk')
+        links = HelpLink.objects.order_by('pk')
+        if options['type']:
+            records = records.filter(type__in=options['type'])
+        if options['status']:
+            records = records.filter(status__in=options['status'])
+        if options['type'] or options['status']:
+            links = links.filter(help_record__in=records.values('pk'))
+        output = open(options['output'], 'w') if options['output'] else sys.stdout
+        try:
+            count = self.write(output, 'help_record', records.values('pk', *RECORD_FIELDS), options['chunk_size'])
+            count += self.write(output, 'help_link', links.values('pk', 'page_url', 'help_record'),
+                                options['chunk_size'])
+        finally:
+            if options['output']:
+                output.close()
+        self.stderr.write('Exported %s objects' % count)
+
+    def write(self, output, model, rows, chunk_size):
+        count = 0
+        # Rows are streamed from the database, never held all in memory
+        for row in rows.iterator(chunk_size=chunk_size):
+            pk = row.pop('pk')
+            if 'data' in row:
+                # Exports are plain JSON, whatever the storage of the source database
+                row['data'] = decode_data(row['data'])
+            output.write(json.dumps({'model': model, 'pk': pk, 'fields': row}, cls=DjangoJSONEncoder) + '\n')
+            count += 1
+        return count
@@ -0,0 +1,69 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import json
+
+from django.core.management.base import BaseCommand
+
+from ensembl.production.webhelp.glossary import GLOSSARY_FIELDS, build_glossary, glossary_matches
+from ensembl.production.webhelp.models import HelpRecord
+
+
+class Command(BaseCommand):
+    help = ('Report which live glossary terms (Lookup words) appear in the live FAQ answers and View content, '
+            'and which are never used.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Records read per query')
+        parser.add_argument('--output', help='Also write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        glossary = build_glossary()
+        terms = {pk: word for pk, word, _ in glossary.terms.values()}
+        documents = {pk: [] for pk in terms}
+        scanned = linked = 0
+        live = HelpRecord.objects.filter(status='live', type__in=list(GLOSSARY_FIELDS))
+        last_id = 0
+        while True:
+            # Seek on the primary key rather than slicing, so that every batch costs the same
+            records = list(live.filter(pk__gt=last_id).order_by('pk').only('pk', 'type', 'data', 'rendered')[
+                :options['batch_size']])
+            if not records:
+                break
+            for record in records:
+                found = set()
+                for field in GLOSSARY_FIELDS[record.type]:
+                    content = record.get_rendered_field(field)
+                    if content is None:
+                        content = str(record.json_data.get(field) or '')
+                    found |= glossary_matches(content, glossary)
+                for pk in found:
+                    documents[pk].append(record.pk)
+                scanned += 1
+                linked += bool(found)
+            last_id = records[-1].pk
+        used = sorted((pk for pk in terms if documents[pk]), key=lambda pk: (-len(documents[pk]), terms[pk]))
+        unused = sorted((pk for pk in terms if not documents[pk]), key=lambda pk: terms[pk])
+        for pk in used:
+            self.stdout.write('%s\t%s (lookup %s)' % (len(documents[pk]), terms[pk], pk))
+        for pk in unused:
+            self.stdout.write('0\t%s (lookup %s)' % (terms[pk], pk))
+        if options['output']:
+            report = {
+                'scanned': scanned,
+                'with_terms': linked,
+                'terms': [{'id': pk, 'word': terms[pk], 'documents': documents[pk]} for pk in used],
+                'unused': [{'id': pk, 'word': terms[pk]} for pk in unused],
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        self.stdout.write(self.style.SUCCESS('%s of %s documents use %s of %s glossary terms' % (
+            linked, scanned, len(used), len(terms))))
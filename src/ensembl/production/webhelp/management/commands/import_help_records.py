@@ -0,0 +1,131 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import json
+import sys
+from itertools import groupby
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from ensembl.production.webhelp.derived import refresh
+from ensembl.production.webhelp.models import HELP_RECORD_TYPES, HelpLink, HelpRecord
+
+RECORD_FIELDS = ('created_by_id', 'created_at', 'modified_by_id', 'modified_at', 'type', 'keyword', 'data',
+                 'status', 'helpful', 'not_helpful')
+
+
+class Command(BaseCommand):
+    help = 'Import help records and help links from an NDJSON export, creating or updating rows in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', nargs='?', help='Input file (default: stdin)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Objects per transaction')
+
+    def handle(self, *args, **options):
+        source = open(options['input']) if options['input'] else sys.stdin
+        counts = {'help_record': 0, 'help_link': 0}
+        imported = []
+        try:
+            for model, batch in self.batches(source, options['batch_size']):
+                with transaction.atomic():
+                    if model == 'help_record':
+                        imported.extend(self.import_records(batch))
+                    else:
+                        self.import_links(batch)
+                counts[model] += len(batch)
+        finally:
+            if options['input']:
+                source.close()
+        self.reset_sequences()
+        # bulk operations bypass HelpRecord.save, rebuild what it would have derived once links are in place
+        for start in range(0, len(imported), options['batch_size']):
+            with transaction.atomic():
+                refresh(HelpRecord.objects.filter(pk__in=imported[start:start + options['batch_size']]))
+        self.stdout.write(self.style.SUCCESS('Imported %(help_record)s records and %(help_link)s links' % counts))
+
+    def batches(self, source, batch_size):
+        """
+        Consecutive objects of the same model, by groups of at most `batch_size`.
+        """
+        batch = []
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise CommandError('Line %s: invalid JSON (%s)' % (number, e))
+            if item.get('model') not in ('help_record', 'help_link'):
+                raise CommandError('Line %s: unknown model %s' % (number, item.get('model')))
+            if batch and (batch[-1]['model'] != item['model'] or len(batch) == batch_size):
+                yield batch[-1]['model'], batch
+                batch = []
+            batch.append(item)
+        if batch:
+            yield batch[-1]['model'], batch
+
+    def import_records(self, batch):
+        records = []
+        for item in batch:
+            fields = item['fields']
+            record_type = fields.get('type')
+            if record_type not in HELP_RECORD_TYPES:
+                raise CommandError('Record %s: unknown type %s' % (item['pk'], record_type))
+            # bulk_create bypasses HelpRecord.save, the type normally forced by the proxy model is set here
+            record = HELP_RECORD_TYPES[record_type](
+                pk=item['pk'],
+                type=HELP_RECORD_TYPES[record_type]._force_type,
+                created_by_id=fields.get('created_by'),
+                created_at=parse_datetime(fields['created_at']) if fields.get('created_at') else None,
+                modified_by_id=fields.get('modified_by'),
+                modified_at=parse_datetime(fields['modified_at']) if fields.get('modified_at') else None,
+                keyword=fields.get('keyword'),
+                data=fields['data'],
+                status=fields['status'],
+                helpful=fields.get('helpful'),
+                not_helpful=fields.get('not_helpful'),
+            )
+            records.append(record)
+        existing = set(HelpRecord.objects.filter(pk__in=[record.pk for record in records]).values_list('pk', flat=True))
+        new = [record for record in records if record.pk not in existing]
+        timestamps = [(record.created_at, record.modified_at) for record in new]
+        for record_type, group in groupby(sorted(new, key=lambda record: record.type), lambda record: record.type):
+            HELP_RECORD_TYPES[record_type].objects.bulk_create(group)
+        # bulk_create stamps auto_now(_add) timestamps, bulk_update writes values as they are: restore the exported ones
+        for record, (created_at, modified_at) in zip(new, timestamps):
+            record.created_at, record.modified_at = created_at, modified_at
+        HelpRecord.objects.bulk_update(new, ['created_at', 'modified_at'])
+        HelpRecord.objects.bulk_update([record for record in records if record.pk in existing], RECORD_FIELDS)
+        return [record.pk for record in records]
+
+    def import_links(self, batch):
+        links = [HelpLink(pk=item['pk'], page_url=item['fields'].get('page_url'),
+                          help_record_id=item['fields'].get('help_record')) for item in batch]
+        # A record has at most one link: keep the target database link of a record, whatever its id
+        by_record = dict(HelpLink.objects.filter(
+            help_record_id__in=[link.help_record_id for link in links if link.help_record_id]
+        ).values_list('help_record_id', 'pk'))
+        for link in links:
+            link.pk = by_record.get(link.help_record_id, link.pk)
+        existing = set(HelpLink.objects.filter(pk__in=[link.pk for link in links]).values_list('pk', flat=True))
+        HelpLink.objects.bulk_create([link for link in links if link.pk not in existing])
+        HelpLink.objects.bulk_update([link for link in links if link.pk in existing], ['page_url', 'help_record'])
+
+    def reset_sequences(self):
+        # Rows were inserted with explicit ids, as loaddata does, move the sequences past them
+        statements = connection.ops.sequence_reset_sql(no_style(), [HelpRecord, HelpLink])
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
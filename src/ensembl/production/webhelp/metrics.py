@@ -0,0 +1,160 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Per view request metrics: time, database queries, JSON decoding and template rendering, collected by
+MetricsMiddleware and exposed in the Prometheus text format.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds of the request duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIMED_KINDS = ('db', 'json', 'template')
+
+_current = ContextVar('webhelp_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    Measures of the request being processed.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = dict.fromkeys(TIMED_KINDS, 0.0)
+
+    def as_dict(self):
+        return dict(queries=self.queries, **{'%s_ms' % kind: round(seconds * 1000, 2)
+                                             for kind, seconds in self.seconds.items()})
+
+
+def start_request():
+    """
+    Start collecting the metrics of the current request (context), returns them and the token to reset.
+    """
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def add_time(kind, seconds):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.seconds[kind] += seconds
+
+
+@contextmanager
+def timed(kind):
+    """
+    Add the time spent in the block to the `kind` time of the current request, if any is being measured.
+    """
+    if _current.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(kind, time.perf_counter() - start)
+
+
+def query_recorder(execute, sql, params, many, context):
+    """
+    Database execute wrapper counting the queries of the current request and their time.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.seconds['db'] += time.perf_counter() - start
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Totals of the measures of every request served by this process, per view.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._requests = {}
+        self._views = {}
+
+    def observe(self, view, method, status, duration, metrics):
+        with self._lock:
+            key = (view, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            totals = self._views.setdefault(view, {
+                'count': 0, 'duration': 0.0, 'buckets': [0] * len(DURATION_BUCKETS), 'queries': 0,
+                'seconds': dict.fromkeys(TIMED_KINDS, 0.0),
+            })
+            totals['count'] += 1
+            totals['duration'] += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    totals['buckets'][i] += 1
+            totals['queries'] += metrics.queries
+            for kind, seconds in metrics.seconds.items():
+                totals['seconds'][kind] += seconds
+
+    def render(self):
+        """
+        Prometheus text exposition (format 0.0.4) of the totals.
+        """
+        with self._lock:
+            requests = sorted(self._requests.items())
+            views = sorted((view, dict(totals, buckets=list(totals['buckets']), seconds=dict(totals['seconds'])))
+                           for view, totals in self._views.items())
+        lines = ['# HELP webhelp_requests_total Requests served, per view, method and status.',
+                 '# TYPE webhelp_requests_total counter']
+        for (view, method, status), count in requests:
+            lines.append('webhelp_requests_total{view="%s",method="%s",status="%s"} %s'
+                         % (escape_label(view), method, status, count))
+        lines += ['# HELP webhelp_request_duration_seconds Request processing time, per view.',
+                  '# TYPE webhelp_request_duration_seconds histogram']
+        for view, totals in views:
+            label = escape_label(view)
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                lines.append('webhelp_request_duration_seconds_bucket{view="%s",le="%s"} %s' % (label, bound, count))
+            lines.append('webhelp_request_duration_seconds_bucket{view="%s",le="+Inf"} %s' % (label, totals['count']))
+            lines.append('webhelp_request_duration_seconds_sum{view="%s"} %.6f' % (label, totals['duration']))
+            lines.append('webhelp_request_duration_seconds_count{view="%s"} %s' % (label, totals['count']))
+        lines += ['# HELP webhelp_db_queries_total Database queries, per view.',
+                  '# TYPE webhelp_db_queries_total counter']
+        lines += ['webhelp_db_queries_total{view="%s"} %s' % (escape_label(view), totals['queries'])
+                  for view, totals in views]
+        for kind, description in (('db', 'Time spent in database queries'),
+                                  ('json', 'Time spent decoding help record data'),
+                                  ('template', 'Time spent rendering templates')):
+            lines += ['# HELP webhelp_%s_seconds_total %s, per view.' % (kind, description),
+                      '# TYPE webhelp_%s_seconds_total counter' % kind]
+            lines += ['webhelp_%s_seconds_total{view="%s"} %.6f' % (kind, escape_label(view), totals['seconds'][kind])
+                      for view, totals in views]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,92 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import asyncio
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from ensembl.production.webhelp import metrics
+
+slow_logger = logging.getLogger('ensembl.production.webhelp.slow_requests')
+
+
+def install_query_recorder(connection, **kwargs):
+    if metrics.query_recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.query_recorder)
+
+
+class MetricsMiddleware:
+    """
+    Collects per view request time, query count and time, JSON decoding and template rendering time, see
+    `metrics`. Requests slower than `WEBHELP_SLOW_REQUEST_MS` milliseconds, when set, are logged as JSON to the
+    `ensembl.production.webhelp.slow_requests` logger.
+    Runs in the mode of the handler, so that under ASGI async views are not serialized through a sync adapter.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes the handler await this middleware, as for Django's MiddlewareMixin
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Connections opened later, in any thread (async views run their queries in worker threads)
+        connection_created.connect(install_query_recorder, dispatch_uid='webhelp_query_recorder')
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        for connection in connections.all():
+            install_query_recorder(connection)
+        request_metrics, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.observe(request, response, request_metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        for connection in connections.all():
+            install_query_recorder(connection)
+        request_metrics, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.observe(request, response, request_metrics, time.perf_counter() - start)
+
+    def observe(self, request, response, request_metrics, duration):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.registry.observe(view, request.method, response.status_code, duration, request_metrics)
+        threshold = getattr(settings, 'WEBHELP_SLOW_REQUEST_MS', None)
+        if threshold is not None and duration * 1000 >= threshold:
+            slow_logger.warning(json.dumps(dict(
+                view=view, method=request.method, path=request.get_full_path(), status=response.status_code,
+                duration_ms=round(duration * 1000, 2), **request_metrics.as_dict())))
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before the response is rendered, the callback right after
+        start = time.perf_counter()
+
+        def rendered(response):
+            metrics.add_time('template', time.perf_counter() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,108 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:03
+
+import html
+import json
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.html import strip_tags
+
+# Frozen copies of the models helpers at the time of this migration, later changes must not alter it
+SEARCH_FIELDS = {
+    'faq': ('question', 'answer', 'category'),
+    'lookup': ('word', 'expanded', 'meaning'),
+    'movie': ('title',),
+    'view': ('content', 'ensembl_action', 'ensembl_object'),
+}
+
+
+def search_text(record_type, keyword, payload, page_url=None):
+    values = [keyword, page_url] + [payload.get(key) for key in SEARCH_FIELDS.get(record_type, ())]
+    text = ' '.join(html.unescape(strip_tags(str(value))) for value in values if value)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE help_record_search_fts USING fts5("
+    "content, content='help_record_search', content_rowid='help_record_id')",
+    "CREATE TRIGGER help_record_search_ai AFTER INSERT ON help_record_search BEGIN "
+    "INSERT INTO help_record_search_fts(rowid, content) VALUES (new.help_record_id, new.content); END",
+    "CREATE TRIGGER help_record_search_ad AFTER DELETE ON help_record_search BEGIN "
+    "INSERT INTO help_record_search_fts(help_record_search_fts, rowid, content) "
+    "VALUES ('delete', old.help_record_id, old.content); END",
+    "CREATE TRIGGER help_record_search_au AFTER UPDATE ON help_record_search BEGIN "
+    "INSERT INTO help_record_search_fts(help_record_search_fts, rowid, content) "
+    "VALUES ('delete', old.help_record_id, old.content); "
+    "INSERT INTO help_record_search_fts(rowid, content) VALUES (new.help_record_id, new.content); END",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS help_record_search_au",
+    "DROP TRIGGER IF EXISTS help_record_search_ad",
+    "DROP TRIGGER IF EXISTS help_record_search_ai",
+    "DROP TABLE IF EXISTS help_record_search_fts",
+]
+MYSQL_FULLTEXT = ["CREATE FULLTEXT INDEX help_record_search_content ON help_record_search (content)"]
+
+
+def create_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            for statement in SQLITE_FTS:
+                schema_editor.execute(statement)
+        except Exception:
+            # SQLite built without FTS5: searches fall back to LIKE on help_record_search
+            for statement in SQLITE_FTS_DROP:
+                schema_editor.execute(statement)
+    elif vendor == 'mysql':
+        for statement in MYSQL_FULLTEXT:
+            schema_editor.execute(statement)
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+
+
+def index_records(apps, schema_editor):
+    HelpRecord = apps.get_model('ensembl_website', 'HelpRecord')
+    HelpLink = apps.get_model('ensembl_website', 'HelpLink')
+    HelpRecordSearch = apps.get_model('ensembl_website', 'HelpRecordSearch')
+    page_urls = dict(HelpLink.objects.values_list('help_record_id', 'page_url'))
+    entries = []
+    for record in HelpRecord.objects.iterator(chunk_size=500):
+        try:
+            payload = json.loads(record.data) if record.data else {}
+        except ValueError:
+            payload = {}
+        entries.append(HelpRecordSearch(help_record_id=record.pk,
+                                        content=search_text(record.type, record.keyword, payload,
+                                                            page_urls.get(record.pk))))
+        if len(entries) == 500:
+            HelpRecordSearch.objects.bulk_create(entries)
+            entries = []
+    HelpRecordSearch.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelpRecordSearch',
+            fields=[
+                ('help_record', models.OneToOneField(db_column='help_record_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='ensembl_website.helprecord')),
+                ('content', models.TextField()),
+            ],
+            options={
+                'db_table': 'help_record_search',
+            },
+        ),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+        migrations.RunPython(index_records, migrations.RunPython.noop),
+    ]
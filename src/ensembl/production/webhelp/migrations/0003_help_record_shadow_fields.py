@@ -0,0 +1,112 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:07
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copies of the models helpers at the time of this migration, later changes must not alter it
+SHADOW_FIELDS = {
+    'faq': {'category': 'faq_category'},
+    'lookup': {'word': 'lookup_word'},
+    'movie': {'youtube_id': 'movie_youtube_id', 'list_position': 'movie_list_position'},
+}
+SHADOW_COLUMNS = ('faq_category', 'lookup_word', 'movie_youtube_id', 'movie_list_position')
+DIVISIONS = ('bacteria', 'fungi', 'metazoa', 'plants', 'protists', 'vertebrates', 'viruses')
+
+
+def shadow_values(model, record_type, payload):
+    values = dict.fromkeys(SHADOW_COLUMNS)
+    for key, column in SHADOW_FIELDS.get(record_type, {}).items():
+        value = payload.get(key)
+        if value in (None, ''):
+            continue
+        field = model._meta.get_field(column)
+        if isinstance(field, models.IntegerField):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        else:
+            value = str(value)[:field.max_length]
+        values[column] = value
+    return values
+
+
+def payload_divisions(record_type, payload):
+    if record_type != 'faq':
+        return []
+    return sorted(set(division for division in payload.get('division') or [] if division in DIVISIONS))
+
+
+def fill_shadow_fields(apps, schema_editor):
+    HelpRecord = apps.get_model('ensembl_website', 'HelpRecord')
+    HelpRecordDivision = apps.get_model('ensembl_website', 'HelpRecordDivision')
+    last_id = 0
+    while True:
+        records = list(HelpRecord.objects.filter(pk__gt=last_id).order_by('pk')[:500])
+        if not records:
+            break
+        divisions = []
+        for record in records:
+            try:
+                payload = json.loads(record.data) if record.data else {}
+            except ValueError:
+                payload = {}
+            for column, value in shadow_values(HelpRecord, record.type, payload).items():
+                setattr(record, column, value)
+            divisions.extend(HelpRecordDivision(help_record_id=record.pk, division=division)
+                             for division in payload_divisions(record.type, payload))
+        HelpRecord.objects.bulk_update(records, SHADOW_COLUMNS)
+        HelpRecordDivision.objects.bulk_create(divisions)
+        last_id = records[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0002_help_record_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='helprecord',
+            name='faq_category',
+            field=models.CharField(db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='helprecord',
+            name='lookup_word',
+            field=models.CharField(db_index=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='helprecord',
+            name='movie_list_position',
+            field=models.IntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='helprecord',
+            name='movie_youtube_id',
+            field=models.CharField(db_index=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='HelpRecordDivision',
+            fields=[
+                ('help_record_division_id', models.AutoField(primary_key=True, serialize=False)),
+                ('division', models.CharField(choices=[('bacteria', 'Bacteria'), ('fungi', 'Fungi'), ('metazoa', 'Metazoa'), ('plants', 'Plants'), ('protists', 'Protists'), ('vertebrates', 'Vertebrates'), ('viruses', 'Viruses')], max_length=32)),
+                ('help_record', models.ForeignKey(db_column='help_record_id', on_delete=django.db.models.deletion.CASCADE, related_name='divisions', to='ensembl_website.helprecord')),
+            ],
+            options={
+                'db_table': 'help_record_division',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='helprecorddivision',
+            index=models.Index(fields=['division', 'help_record'], name='help_record_division_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='helprecorddivision',
+            unique_together={('help_record', 'division')},
+        ),
+        migrations.RunPython(fill_shadow_fields, migrations.RunPython.noop),
+    ]
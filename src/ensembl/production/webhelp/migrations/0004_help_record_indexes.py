@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0003_help_record_shadow_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='helprecord',
+            index=models.Index(fields=['type', 'modified_at', 'created_at'], name='help_record_type_modified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='helprecord',
+            index=models.Index(fields=['type', 'status', 'modified_at'], name='help_record_type_status_idx'),
+        ),
+    ]
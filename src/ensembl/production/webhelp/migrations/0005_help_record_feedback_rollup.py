@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0004_help_record_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelpRecordFeedbackRollup',
+            fields=[
+                ('help_record_feedback_rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=8)),
+                ('bucket', models.DateTimeField()),
+                ('dimension', models.CharField(choices=[('record', 'Record'), ('type', 'Type'), ('division', 'Division')], max_length=16)),
+                ('key', models.CharField(max_length=64)),
+                ('helpful', models.PositiveIntegerField(default=0)),
+                ('not_helpful', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Feedback analytics',
+                'verbose_name_plural': 'Feedback analytics',
+                'db_table': 'help_record_feedback_rollup',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='helprecordfeedbackrollup',
+            index=models.Index(fields=['granularity', 'dimension', 'bucket'], name='help_feedback_bucket_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='helprecordfeedbackrollup',
+            unique_together={('granularity', 'dimension', 'key', 'bucket')},
+        ),
+    ]
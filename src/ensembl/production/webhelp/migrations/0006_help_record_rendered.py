@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0005_help_record_feedback_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='helprecord',
+            name='rendered',
+            field=models.TextField(editable=False, null=True),
+        ),
+    ]
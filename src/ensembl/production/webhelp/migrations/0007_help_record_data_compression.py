@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:30
+
+from django.db import migrations
+import ensembl.production.webhelp.compression
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0006_help_record_rendered'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='helprecord',
+            name='data',
+            field=ensembl.production.webhelp.compression.CompressedTextField(),
+        ),
+    ]
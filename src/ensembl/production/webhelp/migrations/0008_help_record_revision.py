@@ -0,0 +1,39 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import ensembl.production.djcore.fields
+import ensembl.production.djcore.models
+import ensembl.production.webhelp.compression
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('ensembl_website', '0007_help_record_data_compression'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelpRecordRevision',
+            fields=[
+                ('help_record_revision_id', models.AutoField(primary_key=True, serialize=False)),
+                ('number', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('keyword', ensembl.production.djcore.fields.SizedTextField(blank=True, null=True)),
+                ('status', ensembl.production.djcore.fields.EnumField(choices=[('draft', 'Draft'), ('live', 'Live'), ('dead', 'Dead')], max_length=256)),
+                ('checkpoint', models.BooleanField(default=False)),
+                ('payload', ensembl.production.webhelp.compression.CompressedTextField()),
+                ('checksum', models.CharField(max_length=32)),
+                ('created_by', ensembl.production.djcore.models.SpanningForeignKey(blank=True, db_column='created_by', db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='help_record_revisions', to=settings.AUTH_USER_MODEL)),
+                ('help_record', models.ForeignKey(db_column='help_record_id', on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='ensembl_website.helprecord')),
+            ],
+            options={
+                'db_table': 'help_record_revision',
+                'ordering': ['-number'],
+                'unique_together': {('help_record', 'number')},
+            },
+        ),
+    ]
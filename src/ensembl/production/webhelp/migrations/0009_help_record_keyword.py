@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copy of the models helper at the time of this migration, later changes must not alter it
+def record_keywords(keyword):
+    words = (' '.join(word.split()).lower()[:255] for word in (keyword or '').split(','))
+    return sorted(set(word for word in words if word))
+
+
+def fill_keywords(apps, schema_editor):
+    HelpRecord = apps.get_model('ensembl_website', 'HelpRecord')
+    HelpRecordKeyword = apps.get_model('ensembl_website', 'HelpRecordKeyword')
+    last_id = 0
+    while True:
+        records = list(HelpRecord.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'keyword')[:500])
+        if not records:
+            break
+        HelpRecordKeyword.objects.bulk_create([HelpRecordKeyword(help_record_id=pk, keyword=word)
+                                               for pk, keyword in records
+                                               for word in record_keywords(keyword)])
+        last_id = records[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ensembl_website', '0008_help_record_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HelpRecordKeyword',
+            fields=[
+                ('help_record_keyword_id', models.AutoField(primary_key=True, serialize=False)),
+                ('keyword', models.CharField(max_length=255)),
+                ('help_record', models.ForeignKey(db_column='help_record_id', on_delete=django.db.models.deletion.CASCADE, related_name='keywords', to='ensembl_website.helprecord')),
+            ],
+            options={
+                'db_table': 'help_record_keyword',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='helprecordkeyword',
+            index=models.Index(fields=['keyword', 'help_record'], name='help_record_keyword_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='helprecordkeyword',
+            unique_together={('help_record', 'keyword')},
+        ),
+        migrations.RunPython(fill_keywords, migrations.RunPython.noop),
+    ]
@@ -9,10 +9,28 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-from django.db import models
+import hashlib
+import html
+import json
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Case, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+from django.utils.html import strip_tags
 
 from ensembl.production.djcore.fields import EnumField, SizedTextField
-from ensembl.production.djcore.models import BaseTimestampedModel
+from ensembl.production.djcore.models import BaseTimestampedModel, SpanningForeignKey
+
+from ensembl.production.webhelp.compression import CODECS, MARKER, CompressedTextField, data_codec, decode_data
+from ensembl.production.webhelp.metrics import timed
+from ensembl.production.webhelp.rendering import prerender
+from ensembl.production.webhelp.revisions import apply_delta, make_delta
 
 DIVISION_CHOICES = [
     # (None, '----'),
@@ -25,8 +43,238 @@ DIVISION_CHOICES = [
     ('viruses', 'Viruses')
 ]
 
+# `data` keys holding searchable text, per record type
+SEARCH_FIELDS = {
+    'faq': ('question', 'answer', 'category'),
+    'lookup': ('word', 'expanded', 'meaning'),
+    'movie': ('title',),
+    'view': ('content', 'ensembl_action', 'ensembl_object'),
+}
+
+# `data` keys copied to indexed columns on save, per record type
+SHADOW_FIELDS = {
+    'faq': {'category': 'faq_category'},
+    'lookup': {'word': 'lookup_word'},
+    'movie': {'youtube_id': 'movie_youtube_id', 'list_position': 'movie_list_position'},
+}
+SHADOW_COLUMNS = ('faq_category', 'lookup_word', 'movie_youtube_id', 'movie_list_position')
+
+# Separator of the words of the free text `keyword` column
+KEYWORD_SEPARATOR = ', '
+
+# Name of the annotation holding a database side extracted `data` key
+JSON_ANNOTATION = 'json_%s'
+# Name of the annotation holding a database side extracted `rendered` key
+RENDERED_ANNOTATION = 'rendered_%s'
+
+
+def json_extraction_supported(connection):
+    """
+    Whether `connection` can extract keys from JSON encoded text columns.
+    """
+    return connection.vendor in ('mysql', 'sqlite') and connection.features.supports_json_field
+
+
+# Cache key of whether compressed payloads are still stored, per database alias
+COMPRESSED_DATA_KEY = 'webhelp:compressed_data:%s'
+
+
+def compressed_data_stored(connection):
+    """
+    Whether compressed payloads are left in `data`, e.g. since compression was unset and before
+    `compress_help_records --codec none` converted them back. Cached, the check scans the table.
+    """
+    key = COMPRESSED_DATA_KEY % connection.alias
+    stored = cache.get(key)
+    if stored is None:
+        prefixes = Q()
+        for codec in CODECS:
+            prefixes |= Q(data__startswith=codec + MARKER)
+        stored = HelpRecord.objects.using(connection.alias).filter(prefixes).exists()
+        cache.set(key, stored, 60 if stored else 3600)
+    return stored
+
+
+def forget_compressed_data(connection):
+    """
+    Check again whether compressed payloads are stored, after they were converted.
+    """
+    cache.delete(COMPRESSED_DATA_KEY % connection.alias)
+
+
+def data_extraction_supported(connection):
+    """
+    Whether `connection` can extract keys from the `data` column: not once it may hold compressed payloads,
+    written with the configured codec or left from a previous one.
+    """
+    return json_extraction_supported(connection) and data_codec() is None and not compressed_data_stored(connection)
+
+
+KEYWORD_MAX_LENGTH = 255
+
+
+def split_keywords(keyword):
+    """
+    Words of a `keyword` column value, stripped, in order.
+    """
+    return [word.strip() for word in (keyword or '').split(',') if word.strip()]
+
+
+def normalize_keyword(word):
+    """
+    Indexed form of a keyword: lower case, inner white space collapsed, cut to the indexed column size.
+    """
+    return ' '.join(word.split()).lower()[:KEYWORD_MAX_LENGTH]
+
+
+def record_keywords(keyword):
+    """
+    Distinct normalized words of a `keyword` column value.
+    """
+    return sorted(set(normalize_keyword(word) for word in split_keywords(keyword)))
+
+
+class JSONExtract(models.Func):
+    """
+    Text value of a top level `key` from a JSON encoded text column, extracted by the database.
+    """
+    function = 'JSON_EXTRACT'
+    output_field = models.TextField()
+
+    def __init__(self, expression, key, **extra):
+        super().__init__(expression, models.Value('$.%s' % key), **extra)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        # JSON_EXTRACT returns a JSON document on MySQL, unquote it to get the raw text back
+        return self.as_sql(compiler, connection, template="NULLIF(JSON_UNQUOTE(%(function)s(%(expressions)s)), 'null')",
+                           **extra_context)
+
+
+class HelpRecordQuerySet(models.QuerySet):
 
-class HelpRecordManager(models.Manager):
+    def with_json_fields(self, *keys):
+        """
+        Annotate each of `keys` from the `data` payload as `json_<key>`.
+        Backends without JSON functions (or compressed payloads) get NULL placeholders, so that ordering on these
+        annotations stays valid.
+        """
+        if data_extraction_supported(connections[self.db]):
+            annotations = {JSON_ANNOTATION % key: JSONExtract('data', key) for key in keys}
+        else:
+            annotations = {JSON_ANNOTATION % key: models.Value(None, output_field=models.TextField()) for key in keys}
+        return self.annotate(**annotations)
+
+    def with_rendered_fields(self, *keys):
+        """
+        Annotate each of `keys` from the rendered html as `rendered_<key>`, NULL on backends without JSON functions.
+        """
+        if json_extraction_supported(connections[self.db]):
+            annotations = {RENDERED_ANNOTATION % key: JSONExtract('rendered', key) for key in keys}
+        else:
+            annotations = {RENDERED_ANNOTATION % key: models.Value(None, output_field=models.TextField())
+                           for key in keys}
+        return self.annotate(**annotations)
+
+    def count(self):
+        """
+        Row count ignoring plain annotations (`data` keys, search rank, ...).
+        They cannot change the count but would force it into a subquery computing them for every row.
+        """
+        query = self.query
+        if (self._result_cache is None and query.annotations and query.group_by is None and not query.distinct
+                and not query.is_sliced and not query.combinator
+                and not any(annotation.contains_aggregate for annotation in query.annotations.values())):
+            clone = self._chain()
+            clone.query.annotations = {}
+            return clone.count()
+        return super().count()
+
+    def set_status(self, status, user):
+        """
+        Set `status` on every selected record in one UPDATE, stamped as modified by `user`.
+        Returns the number of records changed.
+        """
+        return self.exclude(status=status).update(status=status, modified_by=user, modified_at=timezone.now())
+
+    def add_keyword(self, word, user):
+        """
+        Append `word` to the keywords of the selected records not holding it yet (see `tagged`), in one UPDATE.
+        Returns the number of records changed.
+        """
+        with transaction.atomic(using=self.db):
+            ids = list(self.exclude(pk__in=self.tagged(word).values('pk')).values_list('pk', flat=True))
+            updated = self.model._base_manager.using(self.db).filter(pk__in=ids).update(
+                keyword=Case(When(Q(keyword__isnull=True) | Q(keyword=''), then=Value(word)),
+                             default=Concat('keyword', Value(KEYWORD_SEPARATOR + word)),
+                             output_field=models.TextField()),
+                modified_by=user, modified_at=timezone.now())
+            self._index_keywords(ids)
+        return updated
+
+    def remove_keyword(self, word, user):
+        """
+        Remove `word` (case insensitive) from the keywords of the selected records (see `tagged`), in one UPDATE.
+        Returns the number of records changed.
+        """
+        with transaction.atomic(using=self.db):
+            # Records sharing the same remaining keywords get them from the same branch
+            remaining = defaultdict(list)
+            for pk, keyword in self.tagged(word).values_list('pk', 'keyword'):
+                words = [item for item in split_keywords(keyword)
+                         if normalize_keyword(item) != normalize_keyword(word)]
+                remaining[KEYWORD_SEPARATOR.join(words) or None].append(pk)
+            if not remaining:
+                return 0
+            ids = [pk for pks in remaining.values() for pk in pks]
+            updated = self.model._base_manager.using(self.db).filter(pk__in=ids).update(
+                keyword=Case(*[When(pk__in=pks, then=Value(keyword)) for keyword, pks in remaining.items()],
+                             output_field=models.TextField()),
+                modified_by=user, modified_at=timezone.now())
+            self._index_keywords(ids)
+        return updated
+
+    def _index_keywords(self, ids):
+        # Keywords are indexed, and part of the indexed text, updates bypass save
+        records = list(HelpRecord.objects.using(self.db).filter(pk__in=ids))
+        HelpRecordKeyword.objects.index(records, using=self.db)
+        HelpRecordSearch.objects.index(records, using=self.db)
+
+    def tagged(self, keyword, prefix=False):
+        """
+        Records tagged with `keyword`, case insensitive, or with a keyword starting with it when `prefix`.
+        Looked up on the indexed keyword rows, as an equality or a range of the index.
+        """
+        word = normalize_keyword(keyword)
+        if not prefix:
+            rows = HelpRecordKeyword.objects.filter(keyword=word)
+        elif word and word[-1] < chr(0x10ffff):
+            # Words starting with `word` sort between it and `word` with its last character incremented
+            rows = HelpRecordKeyword.objects.filter(keyword__gte=word, keyword__lt=word[:-1] + chr(ord(word[-1]) + 1))
+        else:
+            rows = HelpRecordKeyword.objects.filter(keyword__startswith=word)
+        return self.filter(pk__in=rows.values('help_record_id'))
+
+    def in_division(self, division):
+        """
+        Records (FAQs) flagged as specific to `division`.
+        """
+        return self.filter(divisions__division=division)
+
+    def summary(self, *fields):
+        """
+        Listing projection: only the primary key, type and `fields` columns are fetched, `data` keys are read from
+        their annotations (see `with_json_fields` / `with_rendered_fields`) and indexed copies (SHADOW_COLUMNS).
+        Backends without JSON functions (or compressed payloads) still load `data`, the only source of its keys there.
+        """
+        fields = ['help_record_id', 'type'] + list(fields)
+        if not data_extraction_supported(connections[self.db]):
+            fields.append('data')
+        if not json_extraction_supported(connections[self.db]):
+            fields.append('rendered')
+        return self.only(*fields)
+
+
+class HelpRecordManager(models.Manager.from_queryset(HelpRecordQuerySet)):
 
     def get_queryset(self):
         if not self.model._force_type:
@@ -34,11 +282,36 @@ class HelpRecordManager(models.Manager):
             return super().get_queryset()
         return super().get_queryset().filter(type=self.model._force_type)
 
+    def refresh_shadow_fields(self, records, using=None):
+        """
+        Recompute the indexed copies of `data` keys of saved `records`, without touching anything else.
+        """
+        records = [record for record in records if record.pk is not None]
+        for record in records:
+            record.set_shadow_fields()
+        self.using(using or self.db).bulk_update(records, SHADOW_COLUMNS)
+        HelpRecordDivision.objects.index(records, using=using)
+
+    def refresh_rendered(self, records, using=None):
+        """
+        Render again the rich text of saved `records`, e.g. for rows saved before the rendering changed.
+        """
+        records = [record for record in records if record.pk is not None]
+        for record in records:
+            record.set_rendered()
+        self.using(using or self.db).bulk_update(records, ['rendered'])
+
 
 class HelpRecord(BaseTimestampedModel):
     class Meta:
         db_table = 'help_record'
         app_label = 'ensembl_website'
+        indexes = [
+            # Type scoped changelists, ordered by last update
+            models.Index(fields=['type', 'modified_at', 'created_at'], name='help_record_type_modified_idx'),
+            # Type scoped listings filtered on status (status facet, API)
+            models.Index(fields=['type', 'status', 'modified_at'], name='help_record_type_status_idx'),
+        ]
 
     objects = HelpRecordManager()
 
@@ -46,14 +319,82 @@ class HelpRecord(BaseTimestampedModel):
     help_record_id = models.AutoField(primary_key=True)
     type = models.CharField(max_length=255)
     keyword = SizedTextField(size_class=1, blank=True, null=True)
-    data = models.TextField()
+    data = CompressedTextField()
     status = EnumField(choices=[('draft', 'Draft'), ('live', 'Live'), ('dead', 'Dead')])
     helpful = models.IntegerField(blank=True, null=True)
     not_helpful = models.IntegerField(blank=True, null=True)
+    # Indexed copies of `data` keys, see SHADOW_FIELDS
+    faq_category = models.CharField(max_length=64, null=True, editable=False, db_index=True)
+    lookup_word = models.CharField(max_length=255, null=True, editable=False, db_index=True)
+    movie_youtube_id = models.CharField(max_length=64, null=True, editable=False, db_index=True)
+    movie_list_position = models.IntegerField(null=True, editable=False, db_index=True)
+    # JSON encoded ready to serve html of the rich text `data` keys, see rendering.prerender
+    rendered = models.TextField(null=True, editable=False)
+
+    # (raw data, decoded data) pair backing `json_data`
+    _json_cache = None
+    # (raw rendered, decoded rendered) pair backing `rendered_data`
+    _rendered_cache = None
+
+    @property
+    def json_data(self):
+        """
+        Decoded (and decompressed) `data` payload, memoized per instance.
+        The cache is keyed on the raw `data` value, so assigning a new payload invalidates it.
+        """
+        if self._json_cache is None or self._json_cache[0] is not self.data:
+            with timed('json'):
+                self._json_cache = (self.data, json.loads(decode_data(self.data)) if self.data else {})
+        return self._json_cache[1]
+
+    def get_json_field(self, key, default=None):
+        """
+        Value of `key` from the payload.
+        Read from the `json_<key>` annotation when `data` was deferred, from the decoded payload otherwise.
+        """
+        annotation = JSON_ANNOTATION % key
+        if annotation in self.__dict__ and 'data' in self.get_deferred_fields():
+            value = self.__dict__[annotation]
+            return default if value is None else value
+        return self.json_data.get(key, default)
+
+    @property
+    def rendered_data(self):
+        """
+        Decoded `rendered` html per rich text key, memoized per instance like `json_data`.
+        """
+        if self._rendered_cache is None or self._rendered_cache[0] is not self.rendered:
+            with timed('json'):
+                self._rendered_cache = (self.rendered, json.loads(self.rendered) if self.rendered else {})
+        return self._rendered_cache[1]
+
+    def get_rendered_field(self, key):
+        """
+        Rendered html of the rich text `key`, None if the record was not rendered (yet) or `key` is not rich text.
+        Read from the `rendered_<key>` annotation when `rendered` was deferred.
+        """
+        annotation = RENDERED_ANNOTATION % key
+        if annotation in self.__dict__ and 'rendered' in self.get_deferred_fields():
+            return self.__dict__[annotation]
+        return self.rendered_data.get(key)
+
+    def set_rendered(self):
+        self.rendered = json.dumps(prerender(self.type, self.json_data))
+
+    def set_shadow_fields(self):
+        for column, value in shadow_values(self.type, self.json_data).items():
+            setattr(self, column, value)
 
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         self.type = self._force_type
+        self.set_shadow_fields()
+        self.set_rendered()
+        if update_fields is not None and 'data' in update_fields:
+            update_fields = set(update_fields).union(SHADOW_COLUMNS, ['rendered'])
         super().save(force_insert, force_update, using, update_fields)
+        HelpRecordDivision.objects.index([self], using=using)
+        HelpRecordKeyword.objects.index([self], using=using)
+        HelpRecordSearch.objects.index([self], using=using)
 
 
 class ViewRecord(HelpRecord):
@@ -64,6 +405,15 @@ class ViewRecord(HelpRecord):
 
     _force_type = 'view'
 
+    def get_help_link(self):
+        """
+        Associated HelpLink or None, served from the relation cache when loaded with `select_related('helplink')`.
+        """
+        try:
+            return self.helplink
+        except HelpLink.DoesNotExist:
+            return None
+
 
 class HelpLink(models.Model):
     class Meta:
@@ -101,3 +451,330 @@ class MovieRecord(HelpRecord):
         app_label = 'ensembl_website'
 
     _force_type = 'movie'
+
+
+# Proxy model for each record type
+HELP_RECORD_TYPES = {model._force_type: model for model in (ViewRecord, FaqRecord, LookupRecord, MovieRecord)}
+
+
+def shadow_values(record_type, payload):
+    """
+    Values of the indexed columns for a record of `record_type` holding `payload`.
+    """
+    values = dict.fromkeys(SHADOW_COLUMNS)
+    for key, column in SHADOW_FIELDS.get(record_type, {}).items():
+        value = payload.get(key)
+        if value in (None, ''):
+            continue
+        field = HelpRecord._meta.get_field(column)
+        if isinstance(field, models.IntegerField):
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        else:
+            value = str(value)[:field.max_length]
+        values[column] = value
+    return values
+
+
+def payload_divisions(record_type, payload):
+    """
+    Divisions a FAQ is specific to, restricted to the known ones.
+    """
+    if record_type != FaqRecord._force_type:
+        return []
+    known = dict(DIVISION_CHOICES)
+    return sorted(set(division for division in payload.get('division') or [] if division in known))
+
+
+class HelpRecordDivisionManager(models.Manager):
+
+    def index(self, records, using=None):
+        """
+        Replace the division rows of `records` with the ones listed in their payload.
+        """
+        records = [record for record in records if record.pk is not None]
+        if not records:
+            return
+        using = using or self.db
+        self.using(using).filter(help_record_id__in=[record.pk for record in records]).delete()
+        self.using(using).bulk_create([self.model(help_record_id=record.pk, division=division)
+                                       for record in records
+                                       for division in payload_divisions(record.type, record.json_data)])
+
+
+class HelpRecordDivision(models.Model):
+    """
+    Indexed copy of the divisions listed in a FAQ `data` payload.
+    """
+
+    class Meta:
+        db_table = 'help_record_division'
+        app_label = 'ensembl_website'
+        unique_together = (('help_record', 'division'),)
+        indexes = [models.Index(fields=['division', 'help_record'], name='help_record_division_idx')]
+
+    objects = HelpRecordDivisionManager()
+
+    help_record_division_id = models.AutoField(primary_key=True)
+    help_record = models.ForeignKey(HelpRecord, db_column='help_record_id', on_delete=models.CASCADE,
+                                    related_name='divisions')
+    division = models.CharField(max_length=32, choices=DIVISION_CHOICES)
+
+
+class HelpRecordKeywordManager(models.Manager):
+
+    def index(self, records, using=None):
+        """
+        Replace the keyword rows of `records` with the normalized words of their `keyword`.
+        """
+        records = [record for record in records if record.pk is not None]
+        if not records:
+            return
+        using = using or self.db
+        self.using(using).filter(help_record_id__in=[record.pk for record in records]).delete()
+        self.using(using).bulk_create([self.model(help_record_id=record.pk, keyword=word)
+                                       for record in records
+                                       for word in record_keywords(record.keyword)])
+
+
+class HelpRecordKeyword(models.Model):
+    """
+    Indexed copy of the comma separated words of `HelpRecord.keyword`, normalized (see `normalize_keyword`).
+    """
+
+    class Meta:
+        db_table = 'help_record_keyword'
+        app_label = 'ensembl_website'
+        unique_together = (('help_record', 'keyword'),)
+        indexes = [models.Index(fields=['keyword', 'help_record'], name='help_record_keyword_idx')]
+
+    objects = HelpRecordKeywordManager()
+
+    help_record_keyword_id = models.AutoField(primary_key=True)
+    help_record = models.ForeignKey(HelpRecord, db_column='help_record_id', on_delete=models.CASCADE,
+                                    related_name='keywords')
+    keyword = models.CharField(max_length=KEYWORD_MAX_LENGTH)
+
+
+def search_text(record_type, keyword, payload, page_url=None):
+    """
+    Plain text to index for a record: keywords, linked page url and the text of the type's searchable `data` keys.
+    """
+    values = [keyword, page_url] + [payload.get(key) for key in SEARCH_FIELDS.get(record_type, ())]
+    text = ' '.join(html.unescape(strip_tags(str(value))) for value in values if value)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class HelpRecordSearchManager(models.Manager):
+
+    def index(self, records, using=None):
+        """
+        (Re)build the search entries of `records`, replacing any previous ones.
+        """
+        records = [record for record in records if record.pk is not None]
+        if not records:
+            return
+        using = using or self.db
+        ids = [record.pk for record in records]
+        page_urls = dict(HelpLink.objects.using(using).filter(help_record_id__in=[
+            record.pk for record in records if record.type == ViewRecord._force_type
+        ]).values_list('help_record_id', 'page_url'))
+        entries = [self.model(help_record_id=record.pk,
+                              content=search_text(record.type, record.keyword, record.json_data,
+                                                  page_urls.get(record.pk)))
+                   for record in records]
+        self.using(using).filter(help_record_id__in=ids).delete()
+        self.using(using).bulk_create(entries)
+
+
+class HelpRecordSearch(models.Model):
+    """
+    Plain text extracted from a HelpRecord, full text indexed by the database (MySQL FULLTEXT, SQLite FTS5).
+    """
+
+    class Meta:
+        db_table = 'help_record_search'
+        app_label = 'ensembl_website'
+
+    objects = HelpRecordSearchManager()
+
+    help_record = models.OneToOneField(HelpRecord, db_column='help_record_id', primary_key=True,
+                                       on_delete=models.CASCADE, related_name='search_entry')
+    content = models.TextField()
+
+
+FEEDBACK_GRANULARITIES = [('hour', 'Hour'), ('day', 'Day')]
+FEEDBACK_DIMENSIONS = [('record', 'Record'), ('type', 'Type'), ('division', 'Division')]
+
+
+class HelpRecordFeedbackRollupManager(models.Manager):
+
+    def add(self, votes, using=None):
+        """
+        Add `votes`, {(help_record_id, hour): (helpful, not_helpful)}, to the hourly and daily rollups of the
+        records, of their type and of their FAQ divisions.
+        """
+        using = using or self.db
+        ids = set(pk for pk, _ in votes)
+        types = dict(HelpRecord.objects.using(using).filter(pk__in=ids).values_list('pk', 'type'))
+        divisions = {}
+        for pk, division in HelpRecordDivision.objects.using(using).filter(help_record_id__in=ids).values_list(
+                'help_record_id', 'division'):
+            divisions.setdefault(pk, []).append(division)
+        deltas = {}
+        for (pk, hour), (helpful, not_helpful) in votes.items():
+            if pk not in types:
+                # Deleted since the vote
+                continue
+            keys = [('record', str(pk)), ('type', types[pk])] + [('division', division)
+                                                                 for division in divisions.get(pk, [])]
+            for granularity, bucket in (('hour', hour), ('day', hour.replace(hour=0))):
+                for dimension, key in keys:
+                    counts = deltas.setdefault((granularity, dimension, key, bucket), [0, 0])
+                    counts[0] += helpful
+                    counts[1] += not_helpful
+        for (granularity, dimension, key, bucket), (helpful, not_helpful) in sorted(deltas.items()):
+            rollup = self.using(using).filter(granularity=granularity, dimension=dimension, key=key, bucket=bucket)
+            changes = {'helpful': F('helpful') + helpful, 'not_helpful': F('not_helpful') + not_helpful}
+            if rollup.update(**changes):
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    self.using(using).create(granularity=granularity, dimension=dimension, key=key, bucket=bucket,
+                                             helpful=helpful, not_helpful=not_helpful)
+            except IntegrityError:
+                # Created meanwhile by another process
+                rollup.update(**changes)
+
+    def totals(self, dimension, since, granularity='day'):
+        """
+        helpful / not_helpful sums and helpfulness `ratio` per key of `dimension` over the buckets from `since`.
+        """
+        return self.filter(granularity=granularity, dimension=dimension, bucket__gte=since).values('key').annotate(
+            helpful_votes=Sum('helpful'), not_helpful_votes=Sum('not_helpful'),
+            votes=Sum(F('helpful') + F('not_helpful'))
+        ).annotate(
+            ratio=Cast('helpful_votes', FloatField()) / Cast('votes', FloatField())
+        ).filter(votes__gt=0).order_by('key')
+
+    def series(self, dimension, since, granularity='day'):
+        return self.filter(granularity=granularity, dimension=dimension, bucket__gte=since).order_by('key', 'bucket')
+
+
+class HelpRecordFeedbackRollup(models.Model):
+    """
+    Helpful / not helpful votes per hour or day, for a record, a record type or a FAQ division.
+    Maintained as votes are flushed, analytics read these instead of scanning individual votes.
+    """
+
+    class Meta:
+        db_table = 'help_record_feedback_rollup'
+        app_label = 'ensembl_website'
+        unique_together = (('granularity', 'dimension', 'key', 'bucket'),)
+        indexes = [models.Index(fields=['granularity', 'dimension', 'bucket'],
+                                name='help_feedback_bucket_idx')]
+        verbose_name = 'Feedback analytics'
+        verbose_name_plural = 'Feedback analytics'
+
+    objects = HelpRecordFeedbackRollupManager()
+
+    help_record_feedback_rollup_id = models.AutoField(primary_key=True)
+    granularity = models.CharField(max_length=8, choices=FEEDBACK_GRANULARITIES)
+    # Start of the hour or day, UTC
+    bucket = models.DateTimeField()
+    dimension = models.CharField(max_length=16, choices=FEEDBACK_DIMENSIONS)
+    # Record id, type or division name
+    key = models.CharField(max_length=64)
+    helpful = models.PositiveIntegerField(default=0)
+    not_helpful = models.PositiveIntegerField(default=0)
+
+
+class HelpRecordRevisionManager(models.Manager):
+
+    def record(self, record, user=None):
+        """
+        Store the current payload, keyword and status of the saved `record` as its next revision by `user` (or user
+        id), unless unchanged since the last one. Revisions are deltas against the previous one, with a full copy
+        (checkpoint) every `WEBHELP_REVISION_CHECKPOINT_INTERVAL` revisions (default 10) to bound the deltas applied
+        on reads.
+        """
+        text = decode_data(record.data) or ''
+        checksum = hashlib.md5(text.encode()).hexdigest()
+        with transaction.atomic(using=self.db):
+            last = self.filter(help_record_id=record.pk).order_by('-number').first()
+            if last is not None and (last.checksum, last.keyword, last.status) == (
+                    checksum, record.keyword, record.status):
+                return None
+            number = last.number + 1 if last is not None else 1
+            interval = getattr(settings, 'WEBHELP_REVISION_CHECKPOINT_INTERVAL', 10)
+            checkpoint, payload = True, text
+            if last is not None and (number - 1) % interval:
+                delta = make_delta(last.get_text(), text)
+                # Rewrites are cheaper stored in full
+                if len(delta) < len(text):
+                    checkpoint, payload = False, delta
+            return self.create(help_record_id=record.pk, number=number, created_by_id=getattr(user, 'pk', user),
+                               keyword=record.keyword, status=record.status, checkpoint=checkpoint, payload=payload,
+                               checksum=checksum)
+
+    def restore(self, revision, user=None):
+        """
+        Save the content of `revision` back on its record, as a new revision.
+        """
+        record = HELP_RECORD_TYPES[revision.help_record.type].objects.get(pk=revision.help_record_id)
+        record.data = revision.get_text()
+        record.keyword = revision.keyword
+        record.status = revision.status
+        record.modified_by = user
+        record.save()
+        return self.record(record, user)
+
+
+class HelpRecordRevision(models.Model):
+    """
+    Saved version of a help record: `payload` holds either the full `data` text (checkpoint) or the delta from the
+    previous revision.
+    """
+
+    class Meta:
+        db_table = 'help_record_revision'
+        app_label = 'ensembl_website'
+        unique_together = (('help_record', 'number'),)
+        ordering = ['-number']
+
+    objects = HelpRecordRevisionManager()
+
+    help_record_revision_id = models.AutoField(primary_key=True)
+    help_record = models.ForeignKey(HelpRecord, db_column='help_record_id', on_delete=models.CASCADE,
+                                    related_name='revisions')
+    number = models.PositiveIntegerField()
+    created_by = SpanningForeignKey(get_user_model(), db_column='created_by', blank=True, null=True,
+                                    related_name='help_record_revisions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    keyword = SizedTextField(size_class=1, blank=True, null=True)
+    status = EnumField(choices=[('draft', 'Draft'), ('live', 'Live'), ('dead', 'Dead')])
+    checkpoint = models.BooleanField(default=False)
+    payload = CompressedTextField()
+    # md5 of the full text, to skip saves without changes and check reconstructions
+    checksum = models.CharField(max_length=32)
+
+    def get_text(self):
+        """
+        Full `data` text of this revision: its checkpoint with the following deltas applied.
+        """
+        if self.checkpoint:
+            return decode_data(self.payload)
+        revisions = list(HelpRecordRevision.objects.using(self._state.db).filter(
+            help_record_id=self.help_record_id, number__lte=self.number,
+            number__gte=HelpRecordRevision.objects.using(self._state.db).filter(
+                help_record_id=self.help_record_id, number__lt=self.number, checkpoint=True,
+            ).order_by('-number').values('number')[:1],
+        ).order_by('number'))
+        text = decode_data(revisions[0].payload)
+        for revision in revisions[1:]:
+            text = apply_delta(text, decode_data(revision.payload))
+        if hashlib.md5(text.encode()).hexdigest() != self.checksum:
+            raise ValueError('Revision %s of help record %s can not be rebuilt' % (self.number, self.help_record_id))
+        return text
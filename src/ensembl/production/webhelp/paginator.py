@@ -0,0 +1,110 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import base64
+import functools
+import hashlib
+import json
+import operator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator reusing the row count of an identical query for `WEBHELP_ADMIN_COUNT_TIMEOUT` seconds (default 60).
+    Totals may lag behind recent changes, in exchange for skipping a full COUNT(*) on every page.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        sql, params = query.sql_with_params()
+        key = 'webhelp:count:%s' % hashlib.md5(('%s:%s:%s' % (self.object_list.db, sql, params)).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, getattr(settings, 'WEBHELP_ADMIN_COUNT_TIMEOUT', 60))
+        return count
+
+
+def keyset_ordering(keys, reverse=False):
+    """
+    Order by expressions of the `keys` field names ('-' prefixed when descending), NULLs last,
+    or the exact opposite order when `reverse`.
+    """
+    ordering = []
+    for key in keys:
+        descending = key.startswith('-')
+        if reverse:
+            ordering.append(F(key.lstrip('-')).asc(nulls_first=True) if descending
+                            else F(key).desc(nulls_first=True))
+        else:
+            ordering.append(F(key.lstrip('-')).desc(nulls_last=True) if descending
+                            else F(key).asc(nulls_last=True))
+    return ordering
+
+
+def keyset_values(obj, keys):
+    return [getattr(obj, key.lstrip('-')) for key in keys]
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode()
+
+
+def decode_cursor(model, keys, cursor):
+    """
+    Key values held by `cursor`, ValueError when it was not produced by `encode_cursor` for `keys`.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor %s' % cursor) from e
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError('Invalid cursor %s' % cursor)
+    try:
+        return [model._meta.get_field(key.lstrip('-')).to_python(value) for key, value in zip(keys, values)]
+    except Exception as e:
+        raise ValueError('Invalid cursor %s' % cursor) from e
+
+
+def keyset_condition(keys, values, before=False):
+    """
+    Filter selecting the rows strictly after the row holding `values` in the `keyset_ordering(keys)` order,
+    or strictly before it when `before`.
+    """
+    branches = []
+    equal = Q()
+    for key, value in zip(keys, values):
+        field = key.lstrip('-')
+        if value is None:
+            # NULLs come last: everything not NULL is before, nothing is after
+            if before:
+                branches.append(equal & Q(**{'%s__isnull' % field: False}))
+            equal &= Q(**{'%s__isnull' % field: True})
+            continue
+        lookup = 'gt' if key.startswith('-') == before else 'lt'
+        step = Q(**{'%s__%s' % (field, lookup): value})
+        if not before:
+            step |= Q(**{'%s__isnull' % field: True})
+        branches.append(equal & step)
+        equal &= Q(**{field: value})
+    if not branches:
+        return Q(pk__in=[])
+    return functools.reduce(operator.or_, branches)
@@ -0,0 +1,103 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import hashlib
+import re
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.html import escape
+
+from ensembl.production.webhelp.images import image_root
+from ensembl.production.webhelp.sanitize import clean_html
+
+# `data` keys holding CKEditor html, per record type
+RICH_TEXT_FIELDS = {
+    'faq': ('question', 'answer'),
+    'lookup': ('meaning',),
+    'view': ('content',),
+}
+
+# [[IMAGE::name.png]] or [[IMAGE::name.png width="100" height="50"]], quotes possibly JSON escaped
+IMAGE_MARKUP = re.compile(r'\[\[IMAGE::([a-zA-Z0-9._-]+)( width=\\?"([0-9]+)\\?" height=\\?"([0-9]+)\\?")?\]\]')
+IMAGE_TAG = (r"<img src='https://raw.githubusercontent.com/Ensembl/ensembl-webcode/main/htdocs/img/help/\1' "
+             r"width='\3' height='\4'/>")
+LOCAL_IMAGE_TAG = "<img src='%s' width='%s' height='%s'/>"
+RENDERER_VERSION = 1
+
+
+def image_names(text):
+    """
+    Names of the images referenced by the IMAGE markup in `text`.
+    """
+    return [match.group(1) for match in IMAGE_MARKUP.finditer(text)]
+
+
+def local_image_tag(match):
+    name, width, height = match.group(1), match.group(3) or '', match.group(4) or ''
+    url = reverse('ensembl_webhelp:help_image', args=[name])
+    if width and height:
+        url += '?' + urlencode({'w': width, 'h': height})
+    return LOCAL_IMAGE_TAG % (escape(url), width, height)
+
+
+def expand_images(text):
+    """
+    Replace the IMAGE markup in `text` with html image tags, pointing to the local images when
+    `WEBHELP_IMAGE_ROOT` is set, to ensembl-webcode on GitHub otherwise.
+    """
+    if image_root():
+        return IMAGE_MARKUP.sub(local_image_tag, text)
+    return IMAGE_MARKUP.sub(IMAGE_TAG, text)
+
+
+def prerender(record_type, payload):
+    """
+    Ready to serve html of the rich text keys of `payload`: cleaned up and with the images expanded.
+    """
+    return {field: expand_images(clean_html(str(payload.get(field) or '')))
+            for field in RICH_TEXT_FIELDS.get(record_type, ())}
+
+
+def render_version(rendered=None):
+    """
+    Version of the html displayed for a record rendered as `rendered` (its stored `rendered` column): changes with
+    the renderer, where images are served from, and the stored rendering (rewritten by backfills, which keep
+    `modified_at`).
+    """
+    # Bump RENDERER_VERSION whenever the same content renders to different html
+    version = '%s:%s' % (RENDERER_VERSION, 'local' if image_root() else 'github')
+    if rendered:
+        version += ':' + hashlib.md5(rendered.encode()).hexdigest()
+    return version
+
+
+def render_cache_key(record, content_field):
+    modified = record.modified_at.timestamp() if record.modified_at else ''
+    return 'webhelp:render:%s:%s:%s:%s' % (record.pk, content_field, modified, render_version())
+
+
+def render_content(record, content_field):
+    """
+    Displayable html of the `content_field` key of `record`, as rendered on save when available.
+    Otherwise cached per record version: any save changes `modified_at` and therefore the cache key.
+    """
+    rendered = record.get_rendered_field(content_field)
+    if rendered is not None:
+        return rendered
+    key = render_cache_key(record, content_field)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = expand_images(str(record.json_data.get(content_field) or ''))
+        cache.set(key, rendered, getattr(settings, 'WEBHELP_RENDER_CACHE_TIMEOUT', 86400))
+    return rendered
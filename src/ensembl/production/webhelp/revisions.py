@@ -0,0 +1,74 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Deltas between successive versions of a help record payload, stored by HelpRecordRevision.
+A delta is the JSON list of the [start, end, text] replacements turning the previous version into the next one, by
+increasing offsets of the previous version.
+"""
+import difflib
+import json
+import re
+
+# Tags, whitespace runs and words: CKEditor html edits only touch a few of them
+TOKEN = re.compile(r'<[^>]*>|\s+|[^\s<]+|<')
+
+
+def tokenize(text):
+    return TOKEN.findall(text)
+
+
+def make_delta(old, new):
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    offsets = [0]
+    for token in old_tokens:
+        offsets.append(offsets[-1] + len(token))
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    edits = [[offsets[i1], offsets[i2], ''.join(new_tokens[j1:j2])]
+             for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+    return json.dumps(edits, separators=(',', ':'))
+
+
+def apply_delta(old, delta):
+    parts = []
+    position = 0
+    for start, end, text in json.loads(delta):
+        parts.append(old[position:start])
+        parts.append(text)
+        position = end
+    parts.append(old[position:])
+    return ''.join(parts)
+
+
+def diff_lines(text):
+    """
+    Lines to compare of a JSON payload: one per key, html values broken around each tag.
+    """
+    try:
+        payload = json.loads(text) if text else {}
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return text.splitlines()
+    lines = []
+    for key, value in sorted(payload.items()):
+        lines.append('%s:' % key)
+        broken = re.sub(r'\s*(<[^>]*>)\s*', r'\n\1\n', str(value or ''))
+        lines.extend('    ' + line for line in broken.splitlines() if line.strip())
+    return lines
+
+
+def html_diff(old, new, old_label, new_label):
+    """
+    Side by side html table of the differences between two payloads, with some context around each change.
+    """
+    return difflib.HtmlDiff(wrapcolumn=80).make_table(diff_lines(old), diff_lines(new), old_label, new_label,
+                                                      context=True, numlines=3)
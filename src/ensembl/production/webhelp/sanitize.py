@@ -0,0 +1,150 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Save time clean up of the CKEditor html: tags and attributes restricted to an allow list, scripting removed,
+whitespace collapsed.
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'col', 'colgroup', 'dd', 'div', 'dl', 'dt', 'em',
+    'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'kbd', 'li', 'ol', 'p', 'pre', 's',
+    'small', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+# Dropped with everything they contain
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template', 'textarea', 'select'}
+VOID_TAGS = {'br', 'col', 'hr', 'img'}
+BLOCK_TAGS = {
+    'blockquote', 'caption', 'col', 'colgroup', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p', 'pre', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+}
+GLOBAL_ATTRIBUTES = {'class', 'id', 'title', 'style', 'lang', 'dir'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'target', 'rel', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan', 'align', 'valign'},
+    'th': {'colspan', 'rowspan', 'align', 'valign', 'scope'},
+    'table': {'border', 'cellpadding', 'cellspacing', 'width', 'summary'},
+    'col': {'span', 'width'},
+    'ol': {'start', 'type'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+# Relative urls, anchors and these schemes only
+SAFE_URL = re.compile(r'^(?:(?:https?|mailto|ftp):|[^:]*$)', re.IGNORECASE)
+UNSAFE_STYLE = re.compile(r'expression|javascript|url\s*\(|@import|behavior', re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+
+class HtmlCleaner(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.output = []
+        self.open_tags = []
+        self.dropping = 0
+        self.preformatted = 0
+        # Whitespace is dropped after block boundaries
+        self.at_block_boundary = True
+
+    def allowed_attributes(self, tag, attrs):
+        allowed = GLOBAL_ATTRIBUTES | ALLOWED_ATTRIBUTES.get(tag, set())
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in URL_ATTRIBUTES and not SAFE_URL.match(WHITESPACE.sub('', value)):
+                continue
+            if name == 'style' and UNSAFE_STYLE.search(value):
+                continue
+            yield ' %s="%s"' % (name, escape(value, quote=True))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self.trim_trailing_space()
+        self.output.append('<%s%s>' % (tag, ''.join(self.allowed_attributes(tag, attrs))))
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+            if tag == 'pre':
+                self.preformatted += 1
+        self.at_block_boundary = tag in BLOCK_TAGS or tag == 'br'
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close the tags left open inside this one
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            if open_tag in BLOCK_TAGS:
+                self.trim_trailing_space()
+            self.output.append('</%s>' % open_tag)
+            if open_tag == 'pre':
+                self.preformatted -= 1
+            if open_tag == tag:
+                break
+        self.at_block_boundary = tag in BLOCK_TAGS
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        if not self.preformatted:
+            data = WHITESPACE.sub(' ', data)
+            if self.at_block_boundary:
+                data = data.lstrip()
+        if data:
+            self.output.append(data.replace('<', '&lt;').replace('>', '&gt;'))
+            self.at_block_boundary = False
+
+    def handle_entityref(self, name):
+        if not self.dropping:
+            self.output.append('&%s;' % name)
+            self.at_block_boundary = False
+
+    def handle_charref(self, name):
+        if not self.dropping:
+            self.output.append('&#%s;' % name)
+            self.at_block_boundary = False
+
+    def trim_trailing_space(self):
+        if self.output and not self.preformatted and self.output[-1].endswith(' '):
+            self.output[-1] = self.output[-1].rstrip(' ')
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.output.append('</%s>' % self.open_tags.pop())
+        self.trim_trailing_space()
+
+
+def clean_html(text):
+    """
+    `text` restricted to the allowed tags and attributes, without scripting and with whitespace collapsed.
+    Comments and unknown tags are removed, their text kept.
+    """
+    cleaner = HtmlCleaner()
+    cleaner.feed(text)
+    cleaner.close()
+    return ''.join(cleaner.output)
@@ -0,0 +1,88 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import re
+
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+
+from ensembl.production.webhelp.models import HelpRecordSearch
+
+FTS_TABLE = 'help_record_search_fts'
+# Annotation holding the relevance of a record for the searched terms, higher is better
+RANK_ANNOTATION = 'search_rank'
+
+_fts_tables = {}
+
+
+def search_backend(connection):
+    """
+    Full text engine available on `connection`: 'mysql', 'fts5' or None when only LIKE scans are possible.
+    """
+    if connection.vendor == 'mysql':
+        return 'mysql'
+    if connection.vendor == 'sqlite':
+        key = (connection.alias, connection.settings_dict['NAME'])
+        if key not in _fts_tables:
+            _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+        return 'fts5' if _fts_tables[key] else None
+    return None
+
+
+def search_terms(search_term):
+    return re.findall(r'\w+', search_term)
+
+
+def search_expressions(queryset, search_term):
+    """
+    Subquery of the record ids whose indexed text matches every word of `search_term` (as a prefix), and the
+    expression ranking them, for `queryset`'s database. None when `search_term` holds no word.
+    """
+    terms = search_terms(search_term)
+    if not terms:
+        return None
+    backend = search_backend(connections[queryset.db])
+    table = queryset.model._meta.db_table
+    if backend == 'fts5':
+        query = ' '.join('"%s"*' % term for term in terms)
+        matching = RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (FTS_TABLE, FTS_TABLE), [query])
+        # bm25 rank is negative, the more relevant the lower
+        rank = RawSQL('SELECT -rank FROM %s WHERE %s MATCH %%s AND rowid = %s.help_record_id'
+                      % (FTS_TABLE, FTS_TABLE, table), [query], output_field=models.FloatField())
+    elif backend == 'mysql':
+        query = ' '.join('+%s*' % term for term in terms)
+        matching = RawSQL('SELECT help_record_id FROM help_record_search '
+                          'WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)', [query])
+        rank = RawSQL('SELECT MATCH(content) AGAINST (%%s IN BOOLEAN MODE) FROM help_record_search '
+                      'WHERE help_record_search.help_record_id = %s.help_record_id' % table, [query],
+                      output_field=models.FloatField())
+    else:
+        entries = HelpRecordSearch.objects.using(queryset.db)
+        for term in terms:
+            entries = entries.filter(content__icontains=term)
+        matching = entries.values('help_record_id')
+        rank = models.Value(0.0, output_field=models.FloatField())
+    return matching, rank
+
+
+def search(queryset, search_term, matched=None):
+    """
+    Restrict `queryset` to the records matching `search_term` in the index, or found in `matched` (e.g. by a search
+    on other columns), annotated with their `search_rank`. None when `search_term` holds no word.
+    """
+    expressions = search_expressions(queryset, search_term)
+    if expressions is None:
+        return None
+    indexed, rank = expressions
+    condition = models.Q(pk__in=indexed)
+    if matched is not None:
+        condition |= models.Q(pk__in=matched.values('pk'))
+    return queryset.filter(condition).annotate(**{RANK_ANNOTATION: rank})
@@ -0,0 +1,169 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import json
+import os
+import tempfile
+
+import django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.template.loader import render_to_string
+
+from ensembl.production.webhelp.glossary import GLOSSARY_FIELDS, build_glossary, glossary_version
+from ensembl.production.webhelp.models import DIVISION_CHOICES, HelpLink, HelpRecord, payload_divisions
+from ensembl.production.webhelp.views import PREVIEWS, preview_context
+
+MANIFEST = 'manifest.json'
+
+# Glossary of a rendering worker process, installed once by `init_worker`
+_worker_glossary = None
+
+
+def write_file(path, content):
+    """
+    Replace `path` with `content` at once, readers never see a partially written file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp')
+    try:
+        with os.fdopen(handle, 'w') as output:
+            output.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def record_path(output_dir, record_type, pk, extension):
+    return os.path.join(output_dir, record_type, '%s.%s' % (pk, extension))
+
+
+def init_worker(glossary):
+    """
+    Initializer of the rendering worker processes: the glossary is sent once per worker, not with every record.
+    """
+    global _worker_glossary
+    django.setup()
+    _worker_glossary = glossary
+
+
+def render_record(row, glossary=None):
+    """
+    Static page and bundle entry of a record given as a `values()` row with its `page_url`, glossary terms linked
+    (`glossary`, or the one installed by `init_worker`).
+    Only uses `row` and the glossary, not the database, so that it can run in a worker process.
+    """
+    record = HelpRecord(pk=row['help_record_id'], type=row['type'], keyword=row['keyword'], data=row['data'],
+                        status=row['status'], modified_at=row['modified_at'], rendered=row['rendered'])
+    glossary = glossary if glossary is not None else _worker_glossary
+    context = preview_context(record, PREVIEWS[record.type].content_field, glossary)
+    page = render_to_string('ensembl_website/helprecord_preview.html', dict(context, object=record, helprecord=record))
+    entry = {
+        'id': record.pk,
+        'type': record.type,
+        'keyword': record.keyword,
+        'modified_at': record.modified_at,
+        'data': record.json_data,
+        'html': context['displayed'],
+    }
+    if row['page_url'] is not None:
+        entry['page_url'] = row['page_url']
+    return record.pk, record.type, page, json.dumps(entry, cls=DjangoJSONEncoder)
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST)) as manifest:
+            return json.load(manifest)['records']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def write_bundles(output_dir, manifest):
+    """
+    Bundle the entries of every record listed in `manifest` into `<type>.json`, and the FAQs into
+    `faq_<division>.json` per division. Entries are read back from their files, nothing is rendered again.
+    """
+    bundles = {}
+    for pk, version in sorted(manifest.items(), key=lambda item: int(item[0])):
+        with open(record_path(output_dir, version['type'], pk, 'json')) as entry_file:
+            entry = entry_file.read()
+        bundles.setdefault('%s.json' % version['type'], []).append(entry)
+        if version['type'] == 'faq':
+            for division in payload_divisions('faq', json.loads(entry)['data']):
+                bundles.setdefault('faq_%s.json' % division, []).append(entry)
+    # Emptied bundles are still rewritten, not left stale
+    for record_type in PREVIEWS:
+        bundles.setdefault('%s.json' % record_type, [])
+    for division, _ in DIVISION_CHOICES:
+        bundles.setdefault('faq_%s.json' % division, [])
+    for name, entries in bundles.items():
+        write_file(os.path.join(output_dir, name), '[%s]' % ','.join(entries))
+    return bundles
+
+
+def build_snapshot(output_dir, executor=None, full=False, chunk_size=200, glossary=None):
+    """
+    Render the live records to `output_dir` as `<type>/<id>.html` pages and `<type>/<id>.json` entries,
+    then rebuild the bundles and `manifest.json`. Only records whose `modified_at` (or page url) differs from
+    the previous manifest are rendered again, unless `full`: FAQs and Views are also rendered again when the
+    glossary changed. Rendering is dispatched to `executor` when given, its workers started with `init_worker`
+    and the `glossary` (default: built from the database) the snapshot is versioned with.
+    Returns the numbers of (rendered, removed, unchanged) records.
+    """
+    previous = load_manifest(output_dir)
+    live = HelpRecord.objects.filter(status='live')
+    page_urls = dict(HelpLink.objects.filter(help_record__status='live').values_list('help_record_id', 'page_url'))
+    glossary_state = glossary_version()
+    manifest = {}
+    changed = []
+    for pk, record_type, modified_at in live.values_list('pk', 'type', 'modified_at').order_by('pk').iterator():
+        version = {
+            'type': record_type,
+            'modified_at': modified_at.isoformat() if modified_at else None,
+            'page_url': page_urls.get(pk),
+        }
+        if record_type in GLOSSARY_FIELDS:
+            version['glossary'] = glossary_state
+        manifest[str(pk)] = version
+        if full or previous.get(str(pk)) != version:
+            changed.append(pk)
+    if glossary is None and executor is None and changed:
+        glossary = build_glossary()
+    for start in range(0, len(changed), chunk_size):
+        rows = list(live.filter(pk__in=changed[start:start + chunk_size]).values(
+            'help_record_id', 'type', 'keyword', 'data', 'status', 'modified_at', 'rendered'))
+        for row in rows:
+            row['page_url'] = page_urls.get(row['help_record_id'])
+        # Workers render with the glossary installed at their start, only the rows are sent to them
+        if executor:
+            # Workers are forked when rows are dispatched, the chunk query has just opened a database connection
+            # again: it must not be shared with them
+            connections.close_all()
+            rendered = executor.map(render_record, rows)
+        else:
+            rendered = (render_record(row, glossary) for row in rows)
+        for pk, record_type, page, entry in rendered:
+            write_file(record_path(output_dir, record_type, pk, 'html'), page)
+            write_file(record_path(output_dir, record_type, pk, 'json'), entry)
+    # Records no longer live, or whose files moved to another type directory
+    removed = [pk for pk in previous if manifest.get(pk, {}).get('type') != previous[pk].get('type')]
+    for pk in removed:
+        for extension in ('html', 'json'):
+            path = record_path(output_dir, previous[pk]['type'], pk, extension)
+            if os.path.exists(path):
+                os.unlink(path)
+    write_bundles(output_dir, manifest)
+    # Written last: an interrupted build is resumed from the previous manifest
+    write_file(os.path.join(output_dir, MANIFEST), json.dumps({'records': manifest}))
+    return len(changed), len(removed), len(manifest) - len(changed)
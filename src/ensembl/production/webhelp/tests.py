@@ -9,9 +9,46 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
-from django.test import TestCase
+import asyncio
+import json
+import os
+import time
+import tempfile
+import unittest
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+
+from ensembl.production.webhelp.async_views import help_records
+from ensembl.production.webhelp.benchmarks.compression import codec_results
+from ensembl.production.webhelp.benchmarks.corpus import generate_corpus
+from ensembl.production.webhelp.benchmarks.suite import run_suite
+from ensembl.production.webhelp.feedback import feedback_buffer
+from ensembl.production.webhelp.glossary import get_glossary
+from ensembl.production.webhelp.images import Image
+from ensembl.production.webhelp.metrics import registry
 from ensembl.production.webhelp.models import *
+from ensembl.production.webhelp.rendering import expand_images, render_content
+
+
+async def slow_view(request):
+    await asyncio.sleep(0.3)
+    return HttpResponse()
+
+
+# Test only urls, see testAsyncMiddleware
+urlpatterns = [path('slow/', slow_view, name='slow')]
 
 
 class HelpRecordTest(TestCase):
@@ -29,3 +66,587 @@ class HelpRecordTest(TestCase):
         self.assertEqual(views, 3)
         faqs = FaqRecord.objects.count()
         self.assertEqual(faqs, 3)
+
+    def testJsonDataMemoized(self):
+        record = MovieRecord.objects.get(pk=556)
+        self.assertIs(record.json_data, record.json_data)
+        self.assertEqual(record.json_data['title'], 'LRG introduction')
+        record.data = '{"title": "LRG"}'
+        self.assertEqual(record.json_data['title'], 'LRG')
+
+    def testShadowFields(self):
+        call_command('backfill_help_records', only=['fields'], stdout=StringIO())
+        self.assertEqual(MovieRecord.objects.get(movie_list_position=18).movie_youtube_id, 'QvGT2G0-hYA')
+        self.assertEqual(LookupRecord.objects.filter(lookup_word__startswith='TSL:').count(), 2)
+        faq = FaqRecord.objects.get(pk=125)
+        faq.data = json.dumps(dict(faq.json_data, category='genes', division=['plants', 'unknown']))
+        faq.save()
+        self.assertEqual(FaqRecord.objects.filter(faq_category='genes').get().pk, 125)
+        self.assertEqual(list(FaqRecord.objects.in_division('plants').values_list('pk', flat=True)), [125])
+        self.assertEqual(list(faq.divisions.values_list('division', flat=True)), ['plants'])
+
+    def testRenderedOnSave(self):
+        faq = FaqRecord.objects.get(pk=125)
+        self.assertIsNone(faq.get_rendered_field('answer'))
+        call_command('backfill_help_records', only=['rendered'], stdout=StringIO())
+        faq.refresh_from_db()
+        self.assertEqual(set(faq.rendered_data), {'question', 'answer'})
+        faq.data = json.dumps(dict(faq.json_data, answer='<p onclick="x()">See  <script>alert(1)</script>'
+                                                          '<a href="javascript:x()">this</a>\n[[IMAGE::gene.png]]'))
+        faq.save(update_fields=['data'])
+        faq = FaqRecord.objects.summary().with_rendered_fields('answer').get(pk=125)
+        self.assertEqual(faq.get_rendered_field('answer'), "<p>See <a>this</a> <img src='https://raw.githubuser"
+                         "content.com/Ensembl/ensembl-webcode/main/htdocs/img/help/gene.png' width='' height=''/></p>")
+        self.assertEqual(render_content(faq, 'answer'), faq.get_rendered_field('answer'))
+        self.assertIsNone(FaqRecord.objects.get(pk=125).get_rendered_field('category'))
+
+    def testDataCompression(self):
+        payload = ViewRecord.objects.get(pk=135).json_data
+        with override_settings(WEBHELP_DATA_COMPRESSION='zlib', WEBHELP_DATA_COMPRESSION_MIN_SIZE=100):
+            call_command('compress_help_records', batch_size=4, stdout=StringIO())
+            raw = dict(HelpRecord.objects.values_list('pk', 'data'))
+            self.assertTrue(raw[135].startswith('zlib:'))
+            self.assertLess(len(raw[135]), len(json.dumps(payload)))
+            # Small payloads stay plain
+            self.assertTrue(all(value.startswith('zlib:') or len(value) < 100 for value in raw.values()))
+            self.assertEqual(ViewRecord.objects.get(pk=135).json_data, payload)
+            # Compressed payloads can not be read by the database
+            movie = MovieRecord.objects.with_json_fields('title').summary().get(pk=556)
+            self.assertEqual(movie.get_json_field('title'), 'LRG introduction')
+            lookup = LookupRecord.objects.create(data=json.dumps({'word': 'LRG', 'meaning': 'x' * 200}),
+                                                 status='live')
+            self.assertTrue(HelpRecord.objects.values_list('data', flat=True).get(pk=lookup.pk).startswith('zlib:'))
+            with self.assertRaises(CommandError):
+                call_command('compress_help_records', codec='none', stdout=StringIO())
+            results = codec_results(repeat=1)
+            self.assertEqual([result['codec'] for result in results][:2], ['none', 'zlib'])
+            self.assertLess(results[1]['ratio'], 1)
+        # Compression unset, payloads still compressed: still not read by the database
+        self.assertFalse(data_extraction_supported(connection))
+        self.assertEqual(MovieRecord.objects.with_json_fields('title').get(pk=556).get_json_field('title'),
+                         'LRG introduction')
+        call_command('compress_help_records', stdout=StringIO())
+        self.assertTrue(HelpRecord.objects.values_list('data', flat=True).get(pk=135).startswith('{'))
+        self.assertEqual(data_extraction_supported(connection), json_extraction_supported(connection))
+
+    def testExportImportRoundTrip(self):
+        call_command('backfill_help_records', stdout=StringIO())
+        with tempfile.NamedTemporaryFile('w+', suffix='.ndjson') as export:
+            call_command('export_help_records', output=export.name, stderr=StringIO())
+            exported = list(HelpRecord.objects.order_by('pk').values())
+            links = list(HelpLink.objects.order_by('pk').values())
+            HelpRecord.objects.filter(pk__in=[125, 135]).delete()
+            HelpRecord.objects.filter(pk=556).update(data='{}', status='dead')
+            call_command('import_help_records', export.name, batch_size=4, stdout=StringIO())
+        self.assertEqual(list(HelpRecord.objects.order_by('pk').values()), exported)
+        self.assertEqual(list(HelpLink.objects.order_by('pk').values()), links)
+        self.assertEqual(ViewRecord.objects.count(), 3)
+        self.assertEqual(HelpRecordSearch.objects.get(pk=135).content.split()[-1], 'Gene')
+
+    def testSnapshot(self):
+        faq = FaqRecord.objects.get(pk=125)
+        faq.data = json.dumps(dict(faq.json_data, division=['plants']))
+        faq.save()
+        with tempfile.TemporaryDirectory() as output:
+            out = StringIO()
+            call_command('build_help_snapshot', output, processes=2, stdout=out)
+            self.assertIn('Rendered 10 records, removed 0, 0 unchanged', out.getvalue())
+            with open(os.path.join(output, 'view', '135.html')) as page:
+                self.assertIn('<h1>Orthologues View</h1>', page.read())
+            with open(os.path.join(output, 'faq_plants.json')) as bundle:
+                self.assertEqual([entry['id'] for entry in json.load(bundle)], [125])
+            FaqRecord.objects.get(pk=126).save()
+            FaqRecord.objects.filter(pk=125).update(status='dead')
+            out = StringIO()
+            call_command('build_help_snapshot', output, processes=1, stdout=out)
+            self.assertIn('Rendered 1 records, removed 1, 8 unchanged', out.getvalue())
+            self.assertFalse(os.path.exists(os.path.join(output, 'faq', '125.html')))
+            with open(os.path.join(output, 'faq.json')) as bundle:
+                self.assertEqual([entry['id'] for entry in json.load(bundle)], [126])
+            with open(os.path.join(output, 'faq_plants.json')) as bundle:
+                self.assertEqual(json.load(bundle), [])
+
+    def testKeywordIndex(self):
+        vep = FaqRecord.objects.create(data='{"question": "Q", "answer": "A"}', status='live',
+                                       keyword='VEP,  Variant  Effect, vep ')
+        plugin = FaqRecord.objects.create(data='{"question": "Q", "answer": "A"}', status='live', keyword='vep plugin')
+        FaqRecord.objects.create(data='{"question": "Q", "answer": "A"}', status='live', keyword='Vertebrates')
+        self.assertEqual(sorted(vep.keywords.values_list('keyword', flat=True)), ['variant effect', 'vep'])
+        self.assertEqual(list(FaqRecord.objects.tagged('Vep')), [vep])
+        self.assertEqual(list(FaqRecord.objects.tagged('VE', prefix=True).order_by('pk')), [vep, plugin,
+                                                                                         FaqRecord.objects.last()])
+        self.assertEqual(list(FaqRecord.objects.tagged('vep', prefix=True).order_by('pk')), [vep, plugin])
+        sql, params = FaqRecord.objects.tagged('vep', prefix=True).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            self.assertIn('help_record_keyword_idx', str(cursor.fetchall()))
+        FaqRecord.objects.filter(pk=plugin.pk).add_keyword('VEP', None)
+        FaqRecord.objects.filter(pk=vep.pk).remove_keyword('vep', None)
+        self.assertEqual(list(FaqRecord.objects.tagged('vep')), [plugin])
+        HelpRecordKeyword.objects.all().delete()
+        call_command('backfill_help_records', only=['keywords'], stdout=StringIO())
+        self.assertEqual(list(HelpRecord.objects.tagged('variant effect')), [vep])
+
+    @override_settings(WEBHELP_ASYNC_THREAD_SENSITIVE=True)
+    def testGlossary(self):
+        view = ViewRecord.objects.get(pk=136)
+        view.data = json.dumps(dict(view.json_data, content='<p>APPRIS and tsl:1, not TSL:10. <a href="#">TSL:2</a>'
+                                                              ' <code>TSL:2</code> APPRIS &amp; TSL:1</p>'))
+        view.save()
+        response = self.client.get('/api/help/136/')
+        self.assertContains(response, '<p><a class="glossary" href="/api/help/493/" title="APPRIS - A system for '
+                                      'annotating alternative splice isoforms">APPRIS</a> and <a class="glossary" '
+                                      'href="/api/help/494/" title="Transcript Support Level 1, when transcripts are '
+                                      'supported by at least one non-suspect mRNA.">tsl:1</a>, not TSL:10. '
+                                      '<a href="#">TSL:2</a> <code>TSL:2</code> APPRIS &amp; TSL:1</p>', html=False)
+        with tempfile.TemporaryDirectory() as output:
+            # Workers render with the glossary installed at their start
+            call_command('build_help_snapshot', output, processes=2, stdout=StringIO())
+            with open(os.path.join(output, 'view', '136.html')) as page:
+                self.assertIn('href="/api/help/494/" title="Transcript Support Level 1', page.read())
+        glossary = get_glossary()
+        self.assertIs(get_glossary(), glossary)
+        LookupRecord.objects.get(pk=494).save()
+        self.assertIsNot(get_glossary(), glossary)
+        out = StringIO()
+        with tempfile.NamedTemporaryFile('w+', suffix='.json') as report:
+            call_command('glossary_coverage', batch_size=2, output=report.name, stdout=out)
+            report = json.load(report)
+        self.assertIn('1 of 5 documents use 2 of 3 glossary terms', out.getvalue())
+        self.assertEqual(report['terms'], [{'id': 493, 'word': 'APPRIS', 'documents': [136]},
+                                           {'id': 494, 'word': 'TSL:1', 'documents': [136]}])
+        self.assertEqual(report['unused'], [{'id': 495, 'word': 'TSL:2'}])
+        etag = self.client.get('/api/help/136/')['ETag']
+        LookupRecord.objects.filter(pk=494).update(status='draft')
+        response = self.client.get('/api/help/136/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'href="/api/help/494/"')
+
+
+class HelpRecordAdminTest(TestCase):
+
+    fixtures = ['webhelp']
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.get(username='testuser'))
+        # Fixtures are loaded as raw rows, index them as for an existing database
+        call_command('backfill_help_records', stdout=StringIO())
+
+    def testChangeListJsonColumnsOrdering(self):
+        response = self.client.get('/ensembl_website/movierecord/', {'o': '1'})
+        self.assertEqual(response.status_code, 200)
+        results = list(response.context['cl'].result_list)
+        self.assertEqual([record.get_json_field('title') for record in results],
+                         ['Introduction to BioMart', 'LRG introduction'])
+        self.assertIn('data', results[0].get_deferred_fields())
+        response = self.client.get('/ensembl_website/movierecord/', {'o': '-1'})
+        self.assertEqual(response.context['cl'].result_list[0].get_json_field('title'), 'LRG introduction')
+
+    def testChangeListSummaryProjection(self):
+        for model in ('faqrecord', 'lookuprecord', 'movierecord', 'viewrecord'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/ensembl_website/%s/' % model)
+            results = response.context['cl'].result_list
+            self.assertTrue({'data', 'rendered', 'created_at'} <= results[0].get_deferred_fields())
+            # Nothing displayed is loaded row by row
+            self.assertFalse([query for query in queries
+                              if 'WHERE "help_record"."help_record_id" = ' in query['sql']], model)
+        self.assertContains(response, 'Gene/Compara_Ortholog')
+
+    def testFacetFilters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/ensembl_website/faqrecord/', {'status': 'live'})
+        # Status, category and division counts from one aggregate query
+        self.assertEqual(len([query for query in queries if 'COUNT(DISTINCT' in query['sql']]), 1)
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        facets = {spec.title: [choice['display'] for choice in spec.choices(response.context['cl'])]
+                  for spec in response.context['cl'].filter_specs}
+        self.assertIn('Live (2)', facets['status'])
+        self.assertIn('Dead (1)', facets['status'])
+        self.assertIn('Export, uploads and downloads (1)', facets['category'])
+        self.assertIn('Plants (0)', facets['division'])
+        # Counts follow the other filters and the search, not this filter's own choice
+        response = self.client.get('/ensembl_website/faqrecord/', {'status': 'live', 'category': 'archives'})
+        facets = {spec.title: [choice['display'] for choice in spec.choices(response.context['cl'])]
+                  for spec in response.context['cl'].filter_specs}
+        self.assertIn('Live (1)', facets['status'])
+        self.assertIn('Dead (0)', facets['status'])
+        self.assertIn('Archives (1)', facets['category'])
+        self.assertIn('Other data (0)', facets['category'])
+        response = self.client.get('/ensembl_website/faqrecord/', {'q': 'biomart'})
+        facets = {spec.title: [choice['display'] for choice in spec.choices(response.context['cl'])]
+                  for spec in response.context['cl'].filter_specs}
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        self.assertIn('Live (2)', facets['status'])
+        self.assertIn('Dead (0)', facets['status'])
+        # A FAQ in two divisions counts once
+        FaqRecord.objects.create(data='{"question": "Q", "answer": "A", "category": "archives", '
+                                      '"division": ["plants", "fungi"]}', status='live')
+        response = self.client.get('/ensembl_website/faqrecord/', {'division': 'plants'})
+        facets = {spec.title: [choice['display'] for choice in spec.choices(response.context['cl'])]
+                  for spec in response.context['cl'].filter_specs}
+        self.assertIn('Live (1)', facets['status'])
+        self.assertIn('Archives (1)', facets['category'])
+        self.assertIn('Fungi (1)', facets['division'])
+        response = self.client.get('/ensembl_website/faqrecord/', {'category': 'archives'})
+        facets = {spec.title: [choice['display'] for choice in spec.choices(response.context['cl'])]
+                  for spec in response.context['cl'].filter_specs}
+        self.assertIn('Live (2)', facets['status'])
+
+    @override_settings(WEBHELP_ADMIN_FAST_COUNT=True)
+    def testFastCount(self):
+        cache.clear()
+        self.client.get('/ensembl_website/lookuprecord/')
+        LookupRecord.objects.create(data='{"word": "new"}', status='live')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/ensembl_website/lookuprecord/')
+        self.assertFalse(any('COUNT(*)' in query['sql'] for query in queries.captured_queries))
+        # Cached total, until it expires
+        self.assertEqual(response.context['cl'].result_count, 3)
+        self.assertEqual(len(response.context['cl'].result_list), 4)
+
+    @override_settings(WEBHELP_ADMIN_KEYSET_PAGINATION=True)
+    def testKeysetPagination(self):
+        ViewRecord.objects.filter(pk=135).update(modified_at=None)
+        with mock.patch.object(admin.site._registry[ViewRecord], 'list_per_page', 1):
+            response = self.client.get('/ensembl_website/viewrecord/')
+            pages = [response.context['cl'].result_list[0].pk]
+            self.assertIsNone(response.context['cl'].previous_page_url)
+            while response.context['cl'].next_page_url:
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get('/ensembl_website/viewrecord/' + response.context['cl'].next_page_url)
+                self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+                pages.append(response.context['cl'].result_list[0].pk)
+            # Most recent first, tied modified_at by descending id, no modified_at last
+            self.assertEqual(pages, [137, 136, 135])
+            while response.context['cl'].previous_page_url:
+                response = self.client.get('/ensembl_website/viewrecord/' + response.context['cl'].previous_page_url)
+                pages.append(response.context['cl'].result_list[0].pk)
+            self.assertEqual(pages, [137, 136, 135, 136, 137])
+            self.assertEqual(response.context['cl'].result_count, 3)
+            self.assertContains(response, 'Next')
+            response = self.client.get('/ensembl_website/viewrecord/', {'after': 'garbage'})
+            self.assertRedirects(response, '/ensembl_website/viewrecord/?e=1')
+
+    def testFeedbackAnalytics(self):
+        faq = FaqRecord.objects.get(pk=125)
+        faq.data = json.dumps(dict(faq.json_data, division=['plants']))
+        faq.save()
+        now = timezone.now()
+        with mock.patch.object(feedback_buffer, '_start'):
+            for pk, helpful, voted_at in ((125, True, now), (125, True, now - timedelta(days=1)), (125, False, now),
+                                          (126, False, now), (493, True, now)):
+                feedback_buffer.add(pk, helpful, voted_at)
+        feedback_buffer.flush()
+        rollups = HelpRecordFeedbackRollup.objects
+        self.assertEqual(rollups.filter(granularity='day', dimension='record', key='125').count(), 2)
+        self.assertEqual({(row['key'], row['helpful_votes'], row['not_helpful_votes'])
+                          for row in rollups.totals('type', now - timedelta(days=7))},
+                         {('faq', 2, 2), ('lookup', 1, 0)})
+        self.assertEqual([(row['key'], row['votes']) for row in rollups.totals('division', now - timedelta(days=7))],
+                         [('plants', 3)])
+        response = self.client.get('/ensembl_website/helprecordfeedbackrollup/', {'min_votes': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['key'] for row in response.context['top']], ['493', '125', '126'])
+        self.assertEqual(response.context['bottom'][0]['url'], '/ensembl_website/faqrecord/126/change/')
+
+    def testBenchmarkSuite(self):
+        counts = generate_corpus(40, seed=1, batch_size=15)
+        self.assertEqual(sum(counts.values()), 40)
+        self.assertEqual(HelpLink.objects.filter(help_record__type='view').count(), counts['view'] + 3)
+        results = run_suite(get_user_model().objects.get(username='testuser'), repeat=1, models=(FaqRecord,))
+        self.assertEqual([result['scenario'] for result in results],
+                         ['changelist', 'changelist_last_page', 'changelist_sorted', 'search', 'preview', 'form_init',
+                          'save_model'])
+
+    def testMetrics(self):
+        registry.reset()
+        with self.assertLogs('ensembl.production.webhelp.slow_requests') as logs, \
+                override_settings(WEBHELP_SLOW_REQUEST_MS=0):
+            self.client.get('/ensembl_website/faqrecord/')
+            self.client.get('/ensembl_website/faqrecord/125/preview/')
+        slow = json.loads(logs.records[1].getMessage())
+        self.assertEqual(slow['view'], 'admin:ensembl_website_faqrecord_preview')
+        self.assertGreater(slow['queries'], 0)
+        self.assertGreater(slow['template_ms'], 0)
+        self.assertGreater(slow['json_ms'], 0)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        exposed = response.content.decode()
+        self.assertIn('webhelp_requests_total{view="admin:ensembl_website_faqrecord_changelist",method="GET",'
+                      'status="200"} 1', exposed)
+        self.assertIn('webhelp_request_duration_seconds_count{view="admin:ensembl_website_faqrecord_preview"} 1',
+                      exposed)
+        self.assertIn('webhelp_template_seconds_total{view="admin:ensembl_website_faqrecord_preview"}', exposed)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/metrics/', REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    @unittest.skipUnless(Image, 'Pillow required')
+    def testLocalImages(self):
+        with tempfile.TemporaryDirectory() as image_root, \
+                override_settings(WEBHELP_IMAGE_ROOT=image_root,
+                                  WEBHELP_IMAGE_CACHE_DIR=os.path.join(image_root, 'thumbnails')):
+            Image.new('RGB', (200, 100)).save(os.path.join(image_root, 'region.png'))
+            response = self.client.get('/api/images/region.png')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+            response = self.client.get('/api/images/region.png', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            response = self.client.get('/api/images/region.png', {'w': 50, 'h': 50})
+            with Image.open(BytesIO(b''.join(response.streaming_content))) as thumbnail:
+                self.assertEqual(thumbnail.size, (50, 25))
+            self.assertEqual(self.client.get('/api/images/missing.png').status_code, 404)
+            self.assertEqual(self.client.get('/api/images/..').status_code, 404)
+            self.assertEqual(expand_images('[[IMAGE::region.png width="50" height="25"]]'),
+                             "<img src='/api/images/region.png?w=50&amp;h=25' width='50' height='25'/>")
+            response = self.client.post('/ensembl_website/faqrecord/add/', {
+                'category': 'genes', 'question': '<p>Where?</p>', 'keyword': 'region', 'status': 'live',
+                'answer': '<p>[[IMAGE::region.png]] [[IMAGE::missing.png]]</p>'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['adminform'].form.errors['answer'], ['Unknown help image: missing.png'])
+
+    def testBulkActions(self):
+        user = get_user_model().objects.get(username='testuser')
+        # Keyword actions select on the keyword index, fixture rows are loaded without save
+        call_command('backfill_help_records', only=['keywords'], stdout=StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/ensembl_website/faqrecord/', {
+                'action': 'make_live', '_selected_action': [125, 126, 127]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        faq = FaqRecord.objects.get(pk=127)
+        self.assertEqual((faq.status, faq.modified_by), ('live', user))
+        self.client.post('/ensembl_website/faqrecord/', {
+            'action': 'add_keyword', '_selected_action': [125, 127], 'keyword': 'VEP'})
+        self.assertEqual(FaqRecord.objects.get(pk=127).keyword, 'VEP')
+        self.assertTrue(FaqRecord.objects.get(pk=125).keyword.endswith('data mining, VEP'))
+        response = self.client.get('/ensembl_website/faqrecord/', {'q': 'vep'})
+        self.assertEqual(sorted(record.pk for record in response.context['cl'].result_list), [125, 127])
+        self.client.post('/ensembl_website/faqrecord/', {
+            'action': 'remove_keyword', '_selected_action': [125, 126, 127], 'keyword': 'id'})
+        self.assertEqual(split_keywords(FaqRecord.objects.get(pk=126).keyword),
+                         ['FAQ', 'archive', 'Ensembl ID', 'old', 'version', 'ID history converter', 'previous',
+                          'release', 'current', 'update'])
+        self.assertNotIn('ID,', FaqRecord.objects.get(pk=125).keyword)
+        # Staff only
+        user.is_staff = False
+        user.save()
+        self.client.post('/ensembl_website/faqrecord/', {'action': 'make_dead', '_selected_action': [125]})
+        self.assertEqual(FaqRecord.objects.get(pk=125).status, 'live')
+
+    def testRevisions(self):
+        original = FaqRecord.objects.get(pk=125).json_data
+        form = {'category': 'genes', 'question': original['question'], 'keyword': 'biomart', 'status': 'live'}
+        with override_settings(WEBHELP_REVISION_CHECKPOINT_INTERVAL=3):
+            for i in range(4):
+                response = self.client.post('/ensembl_website/faqrecord/125/change/',
+                                            dict(form, answer=original['answer'] + '<p>Edit %s</p>' % i))
+                self.assertEqual(response.status_code, 302)
+            # Saved without changes
+            self.client.post('/ensembl_website/faqrecord/125/change/',
+                             dict(form, answer=original['answer'] + '<p>Edit 3</p>'))
+        revisions = list(HelpRecordRevision.objects.filter(help_record_id=125).order_by('number'))
+        # The version replaced by the first change, then one per save
+        self.assertEqual([revision.checkpoint for revision in revisions], [True, False, False, True, False])
+        self.assertLess(len(revisions[2].payload), 100)
+        self.assertEqual(json.loads(revisions[0].get_text())['answer'], original['answer'])
+        self.assertTrue(json.loads(revisions[2].get_text())['answer'].endswith('<p>Edit 1</p>'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/ensembl_website/faqrecord/125/revisions/')
+        self.assertContains(response, '/ensembl_website/faqrecord/125/revisions/3/?against=current')
+        self.assertContains(response, '<td>testuser</td>')
+        # Authors are looked up apart, users may live in another database
+        self.assertFalse([query for query in queries
+                          if 'help_record_revision' in query['sql'] and 'auth_user' in query['sql']])
+        response = self.client.get('/ensembl_website/faqrecord/125/revisions/3/')
+        self.assertContains(response, 'Edit&nbsp;<span class="diff_chg">1</span>')
+        response = self.client.post('/ensembl_website/faqrecord/125/revisions/1/restore/')
+        self.assertRedirects(response, '/ensembl_website/faqrecord/125/change/')
+        self.assertEqual(FaqRecord.objects.get(pk=125).json_data['answer'], original['answer'])
+        self.assertEqual(HelpRecordRevision.objects.filter(help_record_id=125).count(), 6)
+        self.assertEqual(self.client.get('/ensembl_website/faqrecord/125/revisions/9/').status_code, 404)
+
+    def testViewChangeListQueriesConstant(self):
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get('/ensembl_website/viewrecord/')
+        for i in range(10):
+            view = ViewRecord.objects.create(data='{"content": "<p>Page %s</p>"}' % i, status='live')
+            HelpLink.objects.create(page_url='Gene/Page_%s' % i, help_record=view)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get('/ensembl_website/viewrecord/')
+        self.assertEqual(response.context['cl'].result_count, 13)
+        self.assertContains(response, 'Gene/Page_9')
+        self.assertEqual(len(small_page), len(large_page))
+
+    def testFullTextSearch(self):
+        response = self.client.get('/ensembl_website/faqrecord/', {'q': 'biomart'})
+        self.assertEqual(sorted(record.pk for record in response.context['cl'].result_list), [125, 126])
+        # Prefix match, on content and on the linked page url
+        response = self.client.get('/ensembl_website/viewrecord/', {'q': 'paralog'})
+        self.assertEqual(sorted(record.pk for record in response.context['cl'].result_list), [135, 136, 137])
+        self.assertEqual(response.context['cl'].result_list[0].pk, 136)
+        response = self.client.get('/ensembl_website/viewrecord/', {'q': 'Compara_Tree'})
+        self.assertEqual([record.pk for record in response.context['cl'].result_list], [137])
+        # Index follows updates
+        faq = FaqRecord.objects.get(pk=127)
+        faq.data = '{"question": "Where is BioMart?", "answer": "<p>Here</p>"}'
+        faq.save()
+        response = self.client.get('/ensembl_website/faqrecord/', {'q': 'biomart'})
+        self.assertEqual(sorted(record.pk for record in response.context['cl'].result_list), [125, 126, 127])
+        # Links moved or deleted through the admin drop their page url from the index
+        self.client.post('/ensembl_website/helplink/4/change/', {'page_url': 'Gene/Zebra_Atlas'})
+        response = self.client.get('/ensembl_website/viewrecord/', {'q': 'Zebra_Atlas'})
+        self.assertEqual([record.pk for record in response.context['cl'].result_list], [137])
+        self.client.post('/ensembl_website/helplink/4/change/', {'page_url': 'Gene/Quokka_Atlas'})
+        response = self.client.get('/ensembl_website/viewrecord/', {'q': 'Zebra_Atlas'})
+        self.assertEqual([record.pk for record in response.context['cl'].result_list], [])
+        self.client.post('/ensembl_website/helplink/4/delete/', {'post': 'yes'})
+        self.assertFalse(HelpLink.objects.filter(pk=4).exists())
+        response = self.client.get('/ensembl_website/viewrecord/', {'q': 'Quokka_Atlas'})
+        self.assertEqual([record.pk for record in response.context['cl'].result_list], [])
+
+    def testPreviewConditionalGet(self):
+        view = ViewRecord.objects.get(pk=135)
+        view.data = '{"content": "<p>[[IMAGE::tree.png width=\\"10\\" height=\\"20\\"]]</p>"}'
+        view.save()
+        response = self.client.get('/ensembl_website/viewrecord/135/preview/')
+        self.assertContains(response, "help/tree.png' width='10' height='20'/>")
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get('/ensembl_website/viewrecord/135/preview/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        view.save()
+        response = self.client.get('/ensembl_website/viewrecord/135/preview/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        # Rendering rewritten without a change of modified_at (backfill), or served differently
+        ViewRecord.objects.filter(pk=135).update(rendered=json.dumps({'content': '<p>Backfilled</p>'}))
+        response = self.client.get('/ensembl_website/viewrecord/135/preview/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertContains(response, '<p>Backfilled</p>')
+        with tempfile.TemporaryDirectory() as image_root, override_settings(WEBHELP_IMAGE_ROOT=image_root):
+            response = self.client.get('/ensembl_website/viewrecord/135/preview/',
+                                       HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 200)
+
+
+class HelpRecordApiTest(TestCase):
+
+    fixtures = ['webhelp']
+
+    def getJson(self, params, **extra):
+        response = self.client.get('/api/help/', params, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def testKeysetPagination(self):
+        response, page = self.getJson({'type': 'faq', 'limit': 1})
+        self.assertEqual([record['id'] for record in page['results']], [125])
+        response, page = self.getJson({'type': 'faq', 'limit': 1, 'after': 125})
+        self.assertEqual([record['id'] for record in page['results']], [126])
+        # 127 is dead
+        self.assertIsNone(page['next'])
+        response, page = self.getJson({'type': 'view'})
+        self.assertEqual([record['page_url'] for record in page['results']],
+                         ['Gene/Compara_Ortholog', 'Gene/Compara_Paralog', 'Gene/Compara_Tree'])
+
+    def testInvalidPage(self):
+        for params in ({'limit': 0}, {'limit': -1}, {'limit': 1001}, {'limit': 'ten'}, {'after': -1},
+                       {'after': 'x'}):
+            response = self.client.get('/api/help/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', json.loads(response.content))
+        response, page = self.getJson({'type': 'faq', 'limit': 1000})
+        self.assertEqual([record['id'] for record in page['results']], [125, 126])
+
+    def testRendered(self):
+        faq = FaqRecord.objects.get(pk=126)
+        faq.data = json.dumps(dict(faq.json_data, answer='<p onclick="x()">See APPRIS</p><script>x()</script>'))
+        faq.save()
+        response, page = self.getJson({'type': 'faq'})
+        rendered = {record['id']: record['rendered'] for record in page['results']}
+        self.assertEqual(set(rendered[126]), {'question', 'answer'})
+        self.assertEqual(rendered[126]['answer'], '<p>See <a class="glossary" href="/api/help/493/" title="APPRIS - '
+                                                  'A system for annotating alternative splice isoforms">APPRIS</a></p>')
+        etag = response['ETag']
+        LookupRecord.objects.get(pk=493).save()
+        response = self.client.get('/api/help/', {'type': 'faq'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response, page = self.getJson({'type': 'movie'})
+        self.assertNotIn('rendered', page['results'][0])
+
+    def testFilters(self):
+        FaqRecord.objects.create(data='{"question": "Q", "answer": "A", "division": ["plants", "fungi"]}',
+                                 status='live')
+        response, page = self.getJson({'type': 'faq', 'division': 'plants'})
+        self.assertEqual([record['data']['question'] for record in page['results']], ['Q'])
+        self.assertEqual(self.client.get('/api/help/', {'status': 'draft'}).status_code, 403)
+        self.assertEqual(self.client.get('/api/help/', {'type': 'unknown'}).status_code, 400)
+        # Fixture rows are loaded without save
+        call_command('backfill_help_records', only=['keywords'], stdout=StringIO())
+        response, page = self.getJson({'type': 'faq', 'keyword': 'biomart'})
+        self.assertEqual([record['id'] for record in page['results']], [125])
+        response, page = self.getJson({'keyword_prefix': 'bio'})
+        self.assertEqual([record['id'] for record in page['results']], [125, 189])
+        self.assertEqual(self.client.get('/api/help/', {'keyword_prefix': ' '}).status_code, 400)
+
+    def testConditionalGet(self):
+        response, page = self.getJson({'type': 'movie'})
+        response = self.client.get('/api/help/', {'type': 'movie'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        MovieRecord.objects.get(pk=556).save()
+        response = self.client.get('/api/help/', {'type': 'movie'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        # Page urls are part of the response without being part of the records
+        response, page = self.getJson({'type': 'view'})
+        link = HelpLink.objects.filter(help_record_id=135).first()
+        link.page_url = 'Gene/Compara_Ortholog/Moved'
+        link.save()
+        response = self.client.get('/api/help/', {'type': 'view'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def testFeedback(self):
+        before = {pk: (helpful, not_helpful) for pk, helpful, not_helpful in
+                  HelpRecord.objects.values_list('pk', 'helpful', 'not_helpful')}
+        with mock.patch.object(feedback_buffer, '_start'):
+            for pk, helpful in ((125, '1'), (125, '1'), (125, '0'), (126, 'false')):
+                response = self.client.post('/api/help/%s/feedback/' % pk, {'helpful': helpful})
+                self.assertEqual(response.status_code, 202)
+            self.assertEqual(self.client.post('/api/help/125/feedback/', {'helpful': 'maybe'}).status_code, 400)
+            self.assertEqual(self.client.post('/api/help/127/feedback/', {'helpful': '1'}).status_code, 404)
+        # Nothing written until flushed
+        self.assertEqual(HelpRecord.objects.get(pk=125).helpful, before[125][0])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(feedback_buffer.flush(), 2)
+        # One counter update per record
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query['sql'].startswith('UPDATE "help_record" ')]), 2)
+        self.assertEqual(list(FaqRecord.objects.filter(pk__in=[125, 126]).order_by('pk').values_list(
+            'helpful', 'not_helpful')),
+            [(before[125][0] + 2, before[125][1] + 1), (before[126][0], before[126][1] + 1)])
+        self.assertEqual(feedback_buffer.pending(), {})
+
+    @override_settings(WEBHELP_ASYNC_THREAD_SENSITIVE=True)
+    async def testAsyncViews(self):
+        response = await self.async_client.get('/api/help/135/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<h1>Orthologues View</h1>', response.content)
+        response = await self.async_client.get('/api/help/135/', **{'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.get('/api/help/127/')
+        self.assertEqual(response.status_code, 404)
+        response = await help_records(AsyncRequestFactory().get('/api/help/?type=faq&limit=1'))
+        self.assertEqual(response.status_code, 200)
+        page = json.loads(response.content)
+        self.assertEqual([record['id'] for record in page['results']], [125])
+        self.assertTrue(page['next'].endswith('after=125'))
+        response = await help_records(AsyncRequestFactory().get('/api/help/?type=faq&limit=1',
+                                                                **{'if-none-match': response['ETag']}))
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def testAsyncMiddleware(self):
+        # Concurrent requests to async views overlap: no middleware forces them through a sync adapter
+        registry.reset()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[self.async_client.get('/slow/') for _ in range(4)])
+        self.assertLess(time.perf_counter() - start, 0.9)
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertIn('webhelp_requests_total{view="slow",method="GET",status="200"} 4', registry.render())
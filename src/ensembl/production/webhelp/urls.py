@@ -0,0 +1,28 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+from django.conf import settings
+from django.urls import path
+
+from ensembl.production.webhelp.async_views import help_record_page, help_records
+from ensembl.production.webhelp.views import HelpRecordFeedbackView, HelpRecordListView, help_image, metrics_view
+
+app_name = 'ensembl_webhelp'
+
+urlpatterns = [
+    # Under an ASGI server, the async listing does not hold a thread while waiting on the database
+    path('help/', help_records if getattr(settings, 'WEBHELP_ASYNC_VIEWS', False) else HelpRecordListView.as_view(),
+         name='help_records'),
+    path('help/<int:pk>/', help_record_page, name='help_record_page'),
+    path('help/<int:pk>/feedback/', HelpRecordFeedbackView.as_view(), name='help_record_feedback'),
+    path('images/<str:name>', help_image, name='help_image'),
+    path('metrics/', metrics_view, name='metrics'),
+]
@@ -9,14 +9,75 @@
 #   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
+import hashlib
 import json
-import re
+import os
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from django.views.generic import DetailView
 
-from ensembl.production.webhelp.models import HelpRecord
+from ensembl.production.webhelp.feedback import feedback_buffer
+from ensembl.production.webhelp.glossary import GLOSSARY_FIELDS, get_glossary, glossary_version, link_glossary
+from ensembl.production.webhelp.images import thumbnail_path
+from ensembl.production.webhelp.metrics import registry
+from ensembl.production.webhelp.models import DIVISION_CHOICES, HELP_RECORD_TYPES, HelpLink, HelpRecord
+from ensembl.production.webhelp.rendering import RICH_TEXT_FIELDS, render_content, render_version
+
+
+def record_version(request, object_id):
+    """
+    (last update, stored rendering) of the previewed record, looked up once per request for both ETag and
+    Last-Modified.
+    """
+    if not hasattr(request, '_help_record_version'):
+        request._help_record_version = HelpRecord.objects.filter(pk=object_id).values_list(
+            'modified_at', 'rendered').first() or (None, None)
+    return request._help_record_version
+
+
+def record_modified_at(request, object_id, **kwargs):
+    return record_version(request, object_id)[0]
+
+
+def record_etag(request, object_id, **kwargs):
+    modified_at, rendered = record_version(request, object_id)
+    if modified_at is None:
+        return None
+    # Glossary links in the content change with the lookups
+    version = '%s:%s:%s:%s:%s' % (request.resolver_match.view_name, object_id, modified_at.isoformat(),
+                                  render_version(rendered), glossary_version())
+    return hashlib.md5(version.encode()).hexdigest()
+
+
+def preview_context(record, content_field, glossary=None):
+    """
+    Template context of the page of `record`, its `content_field` rendered with the terms of `glossary` (the live
+    glossary by default) linked when the field is one of `GLOSSARY_FIELDS`.
+    """
+    displayed = render_content(record, content_field)
+    if content_field in GLOSSARY_FIELDS.get(record.type, ()):
+        displayed = link_glossary(displayed, glossary if glossary is not None else get_glossary())
+    return {
+        'is_popup': True,
+        'json_data': record.json_data,
+        'displayed': displayed,
+    }
 
 
 # Create your views here.
+@method_decorator(condition(etag_func=record_etag, last_modified_func=record_modified_at), name='dispatch')
+@method_decorator(cache_control(private=True, no_cache=True), name='dispatch')
 class HelpRecordPreview(DetailView):
     queryset = HelpRecord.objects.all()
     http_method_names = ['get']
@@ -27,13 +88,7 @@ class HelpRecordPreview(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['is_popup'] = True
-        context['json_data'] = json.loads(self.object.data)
-        replaced = re.sub(r'(\[\[IMAGE::([a-zA-Z0-9._-]+)( width=\\?"([0-9]+)\\?" height=\\?"([0-9]+)\\?")?\]\])',
-                          r"<img src='https://raw.githubusercontent.com/Ensembl/ensembl-webcode/main/htdocs/img/help/\2' width='\4' height='\5'/>",
-                          self.object.data)
-        context['json_data'] = json.loads(replaced)
-        context['displayed'] = context['json_data'][self.content_field]
+        context.update(preview_context(self.object, self.content_field))
         return context
 
 
@@ -51,3 +106,223 @@ class ViewItemPreview(HelpRecordPreview):
 
 class LookupItemPreview(HelpRecordPreview):
     content_field = "meaning"
+
+
+# Preview of each record type
+PREVIEWS = {
+    'faq': FaqItemPreview,
+    'lookup': LookupItemPreview,
+    'movie': MovieItemPreview,
+    'view': ViewItemPreview,
+}
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def help_records_query(request):
+    """
+    Records selected by the API request parameters: `type`, `status` (default live), `division` and `keyword`
+    (exact) or `keyword_prefix`.
+    """
+    record_type = request.GET.get('type')
+    if record_type is not None and record_type not in HELP_RECORD_TYPES:
+        raise InvalidParameter('Unknown type %s, expected one of %s' % (record_type, ', '.join(HELP_RECORD_TYPES)))
+    status = request.GET.get('status', 'live')
+    if status not in dict(HelpRecord._meta.get_field('status').choices):
+        raise InvalidParameter('Unknown status %s' % status)
+    if status != 'live' and not request.user.is_staff:
+        # Only published content is public
+        raise PermissionDenied
+    queryset = (HELP_RECORD_TYPES[record_type] if record_type else HelpRecord).objects.filter(status=status)
+    division = request.GET.get('division')
+    if division is not None:
+        if division not in dict(DIVISION_CHOICES):
+            raise InvalidParameter('Unknown division %s' % division)
+        queryset = queryset.in_division(division)
+    keyword = request.GET.get('keyword')
+    if keyword is not None:
+        queryset = queryset.tagged(keyword)
+    keyword_prefix = request.GET.get('keyword_prefix')
+    if keyword_prefix is not None:
+        if not keyword_prefix.strip():
+            raise InvalidParameter('Empty keyword prefix')
+        queryset = queryset.tagged(keyword_prefix, prefix=True)
+    return queryset
+
+
+def help_records_version(request, **kwargs):
+    """
+    (count, last update, links signature) of the records selected by the request, computed once per request.
+    """
+    if not hasattr(request, '_help_records_version'):
+        try:
+            queryset = help_records_query(request)
+            version = queryset.aggregate(count=Count('pk'), modified_at=Max('modified_at'))
+            # Page urls are served with the Views but are not part of the record, editing one leaves it untouched
+            links = HelpLink.objects.filter(help_record__in=queryset.filter(type='view').values('pk')).order_by(
+                'help_record_id').values_list('help_record_id', 'page_url')
+            version['links'] = hashlib.md5(json.dumps(list(links)).encode()).hexdigest()
+            request._help_records_version = version
+        except InvalidParameter:
+            request._help_records_version = {'count': 0, 'modified_at': None, 'links': ''}
+    return request._help_records_version
+
+
+def help_records_etag(request, **kwargs):
+    version = help_records_version(request)
+    if version['modified_at'] is None:
+        return None
+    # Any change, addition or removal within the selection changes either the last update or the count
+    signature = '%s:%s:%s:%s:%s:%s' % (request.GET.urlencode(), version['count'], version['modified_at'].isoformat(),
+                                       version['links'], render_version(), glossary_version())
+    return hashlib.md5(signature.encode()).hexdigest()
+
+
+def help_records_last_modified(request, **kwargs):
+    return help_records_version(request)['modified_at']
+
+
+@method_decorator(condition(etag_func=help_records_etag, last_modified_func=help_records_last_modified),
+                  name='dispatch')
+class HelpRecordListView(View):
+    """
+    Read only JSON listing of help records, paginated on help_record_id: pass the last id received as `after`.
+    """
+    http_method_names = ['get']
+    page_size = 100
+    max_page_size = 1000
+
+    def get(self, request, *args, **kwargs):
+        try:
+            records, next_url = help_records_page(request, self.page_size, self.max_page_size)
+        except (InvalidParameter, ValueError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        response = StreamingHttpResponse(help_records_json(records, next_url), content_type='application/json')
+        patch_help_records_cache(request, response)
+        return response
+
+
+def help_records_page(request, page_size, max_page_size):
+    """
+    Page of records selected by the request and the url of the next one, if any.
+    """
+    queryset = help_records_query(request)
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = int(request.GET.get('limit', page_size))
+    except ValueError:
+        raise InvalidParameter('after and limit must be integers')
+    if after < 0:
+        raise InvalidParameter('after must not be negative')
+    if not 1 <= limit <= max_page_size:
+        raise InvalidParameter('limit must be between 1 and %s' % max_page_size)
+    # Seek past the previous page instead of skipping rows: each page costs the same whatever its depth
+    records = list(queryset.filter(pk__gt=after).order_by('pk')[:limit + 1])
+    next_url = None
+    if len(records) > limit:
+        records = records[:limit]
+        params = request.GET.copy()
+        params['after'] = records[-1].pk
+        next_url = request.build_absolute_uri('?' + params.urlencode())
+    return records, next_url
+
+
+def patch_help_records_cache(request, response):
+    if request.GET.get('status', 'live') == 'live':
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'WEBHELP_API_MAX_AGE', 300))
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+
+def rendered_fields(record, glossary):
+    """
+    Ready to serve html of the rich text keys of `record`, with the terms of `glossary` linked in `GLOSSARY_FIELDS`.
+    """
+    rendered = {}
+    for field in RICH_TEXT_FIELDS.get(record.type, ()):
+        rendered[field] = render_content(record, field)
+        if field in GLOSSARY_FIELDS.get(record.type, ()):
+            rendered[field] = link_glossary(rendered[field], glossary)
+    return rendered
+
+
+def help_records_json(records, next_url):
+    """
+    JSON document of a page of records, generated piece by piece.
+    """
+    page_urls = dict(HelpLink.objects.filter(help_record_id__in=[
+        record.pk for record in records if record.type == 'view'
+    ]).values_list('help_record_id', 'page_url'))
+    glossary = get_glossary() if any(record.type in GLOSSARY_FIELDS for record in records) else None
+    yield '{"results": ['
+    for i, record in enumerate(records):
+        item = {
+            'id': record.pk,
+            'type': record.type,
+            'status': record.status,
+            'keyword': record.keyword,
+            'created_at': record.created_at,
+            'modified_at': record.modified_at,
+            'data': record.json_data,
+        }
+        if record.type in RICH_TEXT_FIELDS:
+            item['rendered'] = rendered_fields(record, glossary)
+        if record.pk in page_urls:
+            item['page_url'] = page_urls[record.pk]
+        yield (',' if i else '') + json.dumps(item, cls=DjangoJSONEncoder)
+    yield '], "next": %s}' % json.dumps(next_url)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class HelpRecordFeedbackView(View):
+    """
+    "Was this helpful?" vote on a live record: POST `helpful` as 1 / 0. Votes are buffered and counted on the
+    record at the next flush.
+    """
+    http_method_names = ['post']
+    answers = {'1': True, 'true': True, '0': False, 'false': False}
+
+    def post(self, request, pk, *args, **kwargs):
+        helpful = self.answers.get(request.POST.get('helpful', '').lower())
+        if helpful is None:
+            return JsonResponse({'error': 'helpful must be one of %s' % ', '.join(self.answers)}, status=400)
+        if not HelpRecord.objects.filter(pk=pk, status='live').exists():
+            raise Http404('No live help record %s' % pk)
+        feedback_buffer.add(pk, helpful)
+        return JsonResponse({'id': pk, 'helpful': helpful}, status=202)
+
+
+def metrics_view(request):
+    """
+    Request metrics of this process in the Prometheus text format, for staff users and the
+    `WEBHELP_METRICS_ALLOWED_IPS` addresses (default: localhost).
+    """
+    allowed_ips = getattr(settings, 'WEBHELP_METRICS_ALLOWED_IPS', ('127.0.0.1', '::1'))
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def help_image(request, name):
+    """
+    Help image `name`, resized to fit `w` x `h` when given. Cacheable for `WEBHELP_IMAGE_MAX_AGE` seconds
+    (default 30 days) and revalidated on the file modification time.
+    """
+    try:
+        width, height = int(request.GET.get('w', 0)), int(request.GET.get('h', 0))
+    except ValueError:
+        width = height = 0
+    path = thumbnail_path(name, width, height)
+    if path is None:
+        raise Http404('No help image %s' % name)
+    stat = os.stat(path)
+    etag = quote_etag(hashlib.md5(('%s:%s:%s' % (path, stat.st_mtime, stat.st_size)).encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(open(path, 'rb'))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    patch_cache_control(response, public=True, max_age=getattr(settings, 'WEBHELP_IMAGE_MAX_AGE', 30 * 86400))
+    return response
@@ -0,0 +1,118 @@
+#   See the NOTICE file distributed with this work for additional information
+#   regarding copyright ownership.
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#       http://www.apache.org/licenses/LICENSE-2.0
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+"""
+Local throughput comparison of the WSGI (gunicorn) and ASGI (uvicorn) serving of the read endpoints, on a fresh
+database loaded with the test fixtures. Requires the packages of requirements-prod.txt.
+
+    cd src && python -m ensembl_prodinf_webhelp.loadtest --requests 2000 --concurrency 50
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = ['/api/help/', '/api/help/?type=faq', '/api/help/?type=view&limit=2', '/api/help/135/']
+
+
+def server_command(server, port, workers):
+    if server == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', 'ensembl_prodinf_webhelp.wsgi:application',
+                '--workers', str(workers), '--bind', '127.0.0.1:%s' % port]
+    return [sys.executable, '-m', 'uvicorn', 'ensembl_prodinf_webhelp.asgi:application',
+            '--workers', str(workers), '--port', str(port), '--no-access-log']
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError('Server not answering on %s' % url)
+
+
+def fetch(url):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, ConnectionError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run_load(base_url, paths, requests, concurrency):
+    urls = [base_url + paths[i % len(paths)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(fetch, urls))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(requests / elapsed, 1),
+        'latency_p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'latency_p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--workers', type=int, default=2, help='Server worker processes')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50, help='Simultaneous client connections')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', action='append', dest='paths', help='Path requested in turn, can be repeated')
+    parser.add_argument('--output', help='JSON results file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, WEBHELP_DB_NAME=os.path.join(tmp_dir, 'loadtest.sqlite3'),
+                   DJANGO_SETTINGS_MODULE='ensembl_prodinf_webhelp.settings')
+        for command in (['migrate'], ['loaddata', 'webhelp'], ['backfill_help_records']):
+            subprocess.run([sys.executable, 'manage.py'] + command + ['-v', '0'], cwd=SRC_DIR, env=env, check=True,
+                           stdout=subprocess.DEVNULL)
+        results = {}
+        for server in args.servers:
+            server_env = dict(env, WEBHELP_ASYNC_VIEWS='1' if server == 'asgi' else '')
+            process = subprocess.Popen(server_command(server, args.port, args.workers), cwd=SRC_DIR, env=server_env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = 'http://127.0.0.1:%s' % args.port
+                wait_until_up(base_url + '/api/help/')
+                results[server] = run_load(base_url, args.paths or DEFAULT_PATHS, args.requests, args.concurrency)
+            finally:
+                process.terminate()
+                process.wait()
+            print('%s: %s' % (server, json.dumps(results[server])))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
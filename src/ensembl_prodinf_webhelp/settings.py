@@ -10,6 +10,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import os
 from pathlib import Path
 
 DEBUG = True
@@ -33,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'ensembl.production.webhelp.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,7 +70,7 @@ WSGI_APPLICATION = 'ensembl_prodinf_webhelp.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': Path.joinpath(BASE_DIR.parent, 'db.sqlite3'),
+        'NAME': os.environ.get('WEBHELP_DB_NAME', Path.joinpath(BASE_DIR.parent, 'db.sqlite3')),
     }
 }
 
@@ -81,3 +83,6 @@ USE_L10N = True
 USE_TZ = True
 
 STATIC_URL = '/static/'
+
+# Async listing endpoint, for ASGI servers
+WEBHELP_ASYNC_VIEWS = bool(os.environ.get('WEBHELP_ASYNC_VIEWS'))
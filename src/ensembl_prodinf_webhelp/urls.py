@@ -29,5 +29,6 @@ from django.contrib import admin
 from django.urls import path, include
 
 urlpatterns = [
+    path('api/', include('ensembl.production.webhelp.urls')),
     path(f'', admin.site.urls)
 ]